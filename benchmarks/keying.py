@@ -0,0 +1,59 @@
+# coding=utf-8
+"""
+Benchmarks the black alpha-keying used by the rip command.
+
+Run from the repository root with `python -m benchmarks.keying`.
+"""
+import io
+import random
+import timeit
+
+from PIL import Image
+
+from bot.utils import imaging
+
+
+def _legacy_key(im):
+    """The per-pixel loop rip used before the imaging pipeline existed"""
+    datas = im.getdata()
+    new_data = []
+    for item in datas:
+        if item[0] == 0 and item[1] == 0 and item[2] == 0:
+            new_data.append((0, 0, 0, 0))
+        else:
+            new_data.append(item)
+    im.putdata(new_data)
+    return im
+
+
+def _legacy_process(data):
+    """The decode, key and encode steps of the old rip command"""
+    im = Image.open(io.BytesIO(data)).convert("RGBA")
+    im = _legacy_key(im)
+    buffer = io.BytesIO()
+    im.save(buffer, format="PNG")
+    return io.BytesIO(buffer.getvalue())
+
+
+def _sample(width, height):
+    """Creates a screenshot-like PNG with black borders and noisy content"""
+    im = Image.new("RGB", (width, height), (0, 0, 0))
+    inner = Image.frombytes("RGB", (width // 2, height // 2),
+                            bytes(random.getrandbits(8) for _ in range(width // 2 * height // 2 * 3)))
+    im.paste(inner, (width // 4, height // 4))
+    buffer = io.BytesIO()
+    im.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main(runs=5):
+    for width, height in [(400, 300), (1280, 720), (1920, 1080)]:
+        data = _sample(width, height)
+        assert _legacy_process(data).getvalue() == imaging.process(data, imaging.key_out_black).getvalue()
+        before = timeit.timeit(lambda: _legacy_process(data), number=runs) / runs * 1000
+        after = timeit.timeit(lambda: imaging.process(data, imaging.key_out_black), number=runs) / runs * 1000
+        print(f"{width}x{height}: {before:.1f}ms -> {after:.1f}ms per image ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+Benchmarks the user counts shown by the about command and the shared server count shown by info.
+
+Run from the repository root with `python -m benchmarks.population`.
+"""
+import asyncio
+import random
+import timeit
+
+import discord
+
+from bot.utils.population import PopulationIndex
+
+
+class _Member:
+    """Stands in for discord.Member, which hashes and compares by user ID"""
+    __slots__ = ('id', 'status')
+
+    def __init__(self, user_id, status):
+        self.id = user_id
+        self.status = status
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id >> 22
+
+
+class _Guild:
+    __slots__ = ('id', 'members', '_members')
+
+    def __init__(self, guild_id, members):
+        self.id = guild_id
+        self.members = members
+        self._members = {member.id: member for member in members}
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+
+def _legacy_counts(guilds):
+    """The full scan about did on every invocation"""
+    unique_members = set(member for guild in guilds for member in guild.members)
+    unique_online = sum(1 for m in unique_members if m.status != discord.Status.offline)
+    return len(unique_members), unique_online
+
+
+def _legacy_shared(guilds, user_id):
+    """The probe of every guild info did for each user"""
+    return len([i for i in guilds if i.get_member(user_id)])
+
+
+def _sample(guild_count, users):
+    """Guilds of varying size drawn from a shared pool of users, about a third of them online"""
+    statuses = {user_id: random.choice([discord.Status.online, discord.Status.offline, discord.Status.offline])
+                for user_id in range(users)}
+    guilds = []
+    for guild_id in range(guild_count):
+        size = min(int(random.paretovariate(1.2) * 50), users)
+        members = [_Member(user_id << 22, statuses[user_id]) for user_id in random.sample(range(users), size)]
+        guilds.append(_Guild(guild_id << 22, members))
+    return guilds
+
+
+def main(runs=5):
+    loop = asyncio.get_event_loop()
+    for guild_count, users in [(100, 10000), (1000, 100000), (5000, 500000)]:
+        guilds = _sample(guild_count, users)
+        index = PopulationIndex()
+        loop.run_until_complete(index.reconcile(guilds))
+        assert _legacy_counts(guilds) == (index.users, index.users_online)
+        members = sum(len(guild.members) for guild in guilds)
+        before = timeit.timeit(lambda: _legacy_counts(guilds), number=runs) / runs * 1000
+        after = timeit.timeit(lambda: (index.users, index.users_online), number=runs * 1000) / runs
+        rebuild = timeit.timeit(lambda: loop.run_until_complete(index.reconcile(guilds)), number=runs) / runs * 1000
+        print(f"{guild_count} guilds, {members} members: {before:.1f}ms per scan -> {after * 1000:.2f}us per lookup, "
+              f"{rebuild:.1f}ms per reconcile")
+        user_id = random.choice(guilds[0].members).id
+        assert _legacy_shared(guilds, user_id) == index.shared(user_id)
+        before = timeit.timeit(lambda: _legacy_shared(guilds, user_id), number=runs) / runs * 1000
+        after = timeit.timeit(lambda: index.shared(user_id), number=runs * 1000) / runs
+        print(f"    shared servers: {before:.2f}ms per probe -> {after * 1000:.2f}us per lookup")
+
+
+if __name__ == "__main__":
+    main()
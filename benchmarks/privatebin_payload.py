@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+Benchmarks building and parsing PrivateBin payloads.
+
+Run from the repository root with `python -m benchmarks.privatebin_payload`.
+"""
+import base64
+import json
+import random
+import string
+import timeit
+import zlib
+
+from sjcl import SJCL
+
+from bot.utils import privatebin
+
+SIZES = [2 * 1024, 16 * 1024, 128 * 1024, 1024 * 1024]
+
+
+def _legacy_compress(s):
+    """The compression privatebin used before the byte-level fast path"""
+    co = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    b = co.compress(s) + co.flush()
+    return base64.b64encode(''.join(map(chr, b)).encode())
+
+
+def _legacy_decompress(s):
+    """The decompression privatebin used before the byte-level fast path"""
+    return zlib.decompress(bytearray(map(ord, base64.b64decode(s.encode()).decode('utf-8'))), -zlib.MAX_WBITS).decode()
+
+
+def _legacy_make_payload(text):
+    """The payload build privatebin used before the fast path, minus the request fields"""
+    key = base64.urlsafe_b64encode(b'0' * 32)
+    cipher = SJCL().encrypt(_legacy_compress(text.encode()), key, mode='gcm')
+    for k in ['salt', 'iv', 'ct']:
+        cipher[k] = cipher[k].decode()
+    return json.dumps(cipher, ensure_ascii=False), key
+
+
+def _sample(size):
+    """Creates traceback-like text that compresses about as well as real eval output"""
+    words = [''.join(random.choices(string.ascii_letters, k=random.randint(2, 12))) for _ in range(500)]
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(f'  File "{random.choice(words)}.py", line {random.randint(1, 999)}, in '
+                     f'{" ".join(random.choices(words, k=random.randint(1, 8)))} \N{SNAKE}')
+    return '\n'.join(lines)[:size]
+
+
+def _check(text):
+    """Checks the fast path is byte-exact and interoperates with the old format both ways"""
+    compressed = privatebin._compress(text.encode())
+    assert compressed == _legacy_compress(text.encode())
+    assert _legacy_decompress(compressed.decode()) == text
+    assert privatebin._decompress(_legacy_compress(text.encode()).decode()) == text
+
+    payload, key = privatebin._make_payload(text, '15min', 'plaintext', None)
+    assert privatebin._decrypt(json.loads(payload['data']), key) == text
+    assert _legacy_decompress(SJCL().decrypt(json.loads(payload['data']), key).decode()) == text
+    data, key = _legacy_make_payload(text)
+    assert privatebin._decrypt(json.loads(data), key) == text
+
+
+def main(runs=5):
+    for size in SIZES:
+        text = _sample(size)
+        _check(text)
+        data = text.encode()
+        compressed = privatebin._compress(data).decode()
+
+        def rate(func, *args):
+            return size / (timeit.timeit(lambda: func(*args), number=runs) / runs) / 1024 / 1024
+
+        print(f"{size // 1024:>5}KB  compress {rate(_legacy_compress, data):6.1f} -> "
+              f"{rate(privatebin._compress, data):6.1f} MB/s  "
+              f"decompress {rate(_legacy_decompress, compressed):6.1f} -> "
+              f"{rate(privatebin._decompress, compressed):6.1f} MB/s  "
+              f"payload {rate(_legacy_make_payload, text):6.2f} -> "
+              f"{rate(privatebin._make_payload, text, '15min', 'plaintext', None):6.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # coding=utf-8
 """Error handling for the bot"""
+import asyncio
 import sys
 import traceback
 
@@ -8,7 +9,18 @@ from discord.ext import commands
 from raven import Client
 
 from bot.main import Bot
-from bot.utils import checks
+from bot.utils import checks, utils
+
+
+class CleanContent:
+    """Defers a message's clean_content, which resolves mentions, until it's logged"""
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message.clean_content
 
 
 class Core:
@@ -17,6 +29,22 @@ class Core:
     def __init__(self, bot: Bot):
         self.bot = bot
         self.sentry = self.get_sentry()
+        self.reconcile_task = self.bot.loop.create_task(self.reconcile_population())
+
+    def __unload(self):
+        self.reconcile_task.cancel()
+
+    async def reconcile_population(self):
+        """Rebuilds the population index every so often, correcting drift from missed events"""
+        await self.bot.wait_until_ready()
+        interval = self.bot.config['extras'].get('population', {}).get('reconcile', 900)
+        built = False
+        while True:
+            drift = await self.bot.population.reconcile(self.bot.guilds)
+            if drift and built:
+                self.bot.logger.info(f"Population index was off by {drift} users, rebuilt")
+            built = True
+            await asyncio.sleep(interval)
 
     def get_sentry(self):
         """Checks to see if sentry is actually available"""
@@ -44,6 +72,7 @@ class Core:
 
     async def on_command_error(self, ctx, e):
         """Catch command errors."""
+        self.bot.metrics.failed(ctx, e)
         if isinstance(e.__cause__, discord.errors.NotFound):
             return
         elif isinstance(e, commands.errors.CommandNotFound):
@@ -76,6 +105,8 @@ class Core:
         elif isinstance(e, commands.errors.CheckFailure):
             await ctx.channel.send("\N{CROSS MARK} Check failed. You probably don't have "
                                    "permission to do this.", delete_after=10)
+        elif isinstance(e, utils.DownloadError):
+            await ctx.channel.send(f"\N{CROSS MARK} {e}", delete_after=10)
         elif isinstance(e, commands.errors.CommandOnCooldown):
             await ctx.channel.send(f"\N{NO ENTRY} {e}", delete_after=10)
         elif isinstance(e, (commands.errors.BadArgument, commands.errors.MissingRequiredArgument)):
@@ -102,24 +133,92 @@ class Core:
                                                                                                    'error': e})
                     self.bot.logger.warn("Error sent to Sentry!")
 
+    async def on_member_join(self, member):
+        """Counts new members in the population index"""
+        self.bot.population.add(member)
+
+    async def on_member_remove(self, member):
+        """Stops counting members that left in the population index"""
+        self.bot.population.remove(member)
+        self.bot.permissions.invalidate_member(member.guild.id, member.id)
+
+    async def on_member_update(self, before, after):
+        """Follows status changes in the population index and role changes in the permission cache"""
+        if before.status != after.status:
+            self.bot.population.update(before, after)
+        if before.roles != after.roles:
+            self.bot.permissions.invalidate_member(after.guild.id, after.id)
+
+    async def on_guild_join(self, guild):
+        """Counts members of new guilds in the population index"""
+        self.bot.population.add_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        """Stops counting members of guilds left in the population index"""
+        self.bot.population.remove_guild(guild)
+        self.bot.permissions.invalidate_guild(guild.id)
+        self.bot.roles.forget(guild.id)
+        self.bot.bans.forget(guild.id)
+
+    async def on_guild_available(self, guild):
+        """Drops indexed bans of guilds coming back from an outage, bans made meanwhile weren't seen"""
+        self.bot.bans.forget(guild.id)
+
+    async def on_member_ban(self, guild, user):
+        """Adds bans to the ban index"""
+        self.bot.bans.banned(guild, user)
+
+    async def on_member_unban(self, guild, user):
+        """Removes unbans from the ban index"""
+        self.bot.bans.unbanned(guild, user)
+
+    async def on_guild_update(self, before, after):
+        """Drops cached permissions when the guild owner changes"""
+        if before.owner_id != after.owner_id:
+            self.bot.permissions.invalidate_guild(after.id)
+
+    async def on_guild_role_create(self, role):
+        """Drops cached permissions of the guild, the new role may be given out or moved above others"""
+        self.bot.permissions.invalidate_guild(role.guild.id)
+        self.bot.roles.add(role)
+
+    async def on_guild_role_update(self, before, after):
+        """Drops cached permissions of the guild and follows renames"""
+        self.bot.permissions.invalidate_guild(after.guild.id)
+        self.bot.roles.rename(before, after)
+
+    async def on_guild_role_delete(self, role):
+        """Drops cached permissions of the guild and the deleted role"""
+        self.bot.permissions.invalidate_guild(role.guild.id)
+        self.bot.roles.remove(role)
+
+    async def on_guild_channel_update(self, before, after):
+        """Drops cached permissions for a channel, its overwrites may have changed"""
+        self.bot.permissions.invalidate_channel(after.guild.id, after.id)
+
+    async def on_guild_channel_delete(self, channel):
+        """Drops cached permissions for a deleted channel"""
+        self.bot.permissions.invalidate_channel(channel.guild.id, channel.id)
+
     async def on_command(self, ctx):
         """Event ran every time a command is run"""
         author = ctx.author
+        # Arguments are only turned into text if the record is kept, possibly by the logging thread
+        fields = {"shard": ctx.guild.shard_id if ctx.guild else 0, "guild_id": ctx.guild.id if ctx.guild else None,
+                  "user_id": author.id, "command": ctx.command.qualified_name}
         if ctx.guild is not None:
-            self.bot.command_logger.info(f"[Shard {ctx.guild.shard_id}] {ctx.guild.name} (ID: {ctx.guild.id}) > "
-                                         f"{author} (ID: {author.id}): {ctx.message.clean_content}")
+            self.bot.command_logger.info("[Shard %s] %s (ID: %s) > %s (ID: %s): %s", ctx.guild.shard_id,
+                                         ctx.guild.name, ctx.guild.id, author, author.id, CleanContent(ctx.message),
+                                         extra=fields)
         else:
-            self.bot.command_logger.info(f"[Shard 0] Private Messages > {author} (ID: {author.id}):"
-                                         f" {ctx.message.clean_content}")
+            self.bot.command_logger.info("[Shard 0] Private Messages > %s (ID: %s): %s", author, author.id,
+                                         CleanContent(ctx.message), extra=fields)
 
     async def on_command_completion(self, ctx):
         """Event ran every time a command completes successfully"""
         # Ignore the bot owner because why should you inflate your own stats
         if not ctx.author == self.bot.app_info.owner:
-            self.bot.commands_used[ctx.command.name] += 1
-            if not ctx.guild:
-                ctx.guild = "PMs"
-            self.bot.commands_used_in[str(ctx.guild)] += 1
+            self.bot.stats.record(ctx.command.qualified_name, ctx.guild.id if ctx.guild else None)
 
 
 def setup(bot: Bot):
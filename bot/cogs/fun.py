@@ -19,6 +19,7 @@ from discord.ext import commands
 from pyfiglet import figlet_format
 
 from bot.main import Bot
+from bot.utils import utils
 
 
 def get_moon_phase(date):
@@ -57,6 +58,11 @@ class Fun:
             self.rules = f.readlines()
         with io.open('bot/files/copypasta.txt', encoding='utf8') as f:
             self.copy = f.readlines()
+        size = bot.config['extras'].get('prefetch', {}).get('size', 3)
+        bot.prefetcher.register("inspiro", self.fetch_inspiro, size=size)
+        bot.prefetcher.register("randomfacts", self.fetch_randomfacts, size=size)
+        bot.prefetcher.register("joke", self.fetch_joke, size=size)
+        bot.prefetcher.register("lenny", self.fetch_lenny, size=size)
 
     @commands.command()
     async def scramble(self, ctx):
@@ -84,11 +90,7 @@ class Fun:
     @commands.command(aliases=["inspire", "inspireme"])
     async def inspiro(self, ctx):
         """Receive an inspiring auto-generated message."""
-        async with self.bot.session.get("https://inspirobot.me/api?generate=true") as get:
-            assert isinstance(get, aiohttp.ClientResponse)
-            url = str(await get.read(), encoding='utf8')
-        async with self.bot.session.get(url) as get:
-            img = io.BytesIO(await get.read())
+        img, url = await self.bot.prefetcher.get("inspiro")
         await ctx.send(file=discord.File(img, filename=url))
 
     @commands.command()
@@ -99,34 +101,17 @@ class Fun:
     @commands.command(aliases=["facts"])
     async def randomfacts(self, ctx):
         """Gives 3 random facts!"""
-        async with self.bot.session.get("http://randomfactgenerator.net/") as get:
-            assert isinstance(get, aiohttp.ClientResponse)
-            _html = await get.read()
-        html = BSoup(_html, 'html.parser')
-        facts = []
-        for fact in html.find_all(id="z"):
-            facts.append(fact.contents[0])
-        await ctx.send(f"Did you know?\n"
-                       f"\t1. {facts[0]}\n"
-                       f"\t2. {facts[1]}\n"
-                       f"\t3. {facts[2]}")
+        await ctx.send(await self.bot.prefetcher.get("randomfacts"))
 
     @commands.command(aliases=["dadjoke"])
     async def joke(self, ctx):
         """Sends a Dad Joke!"""
-        headers = {"Accept": "application/json"}
-        async with self.bot.session.get("https://icanhazdadjoke.com", headers=headers) as get:
-            assert isinstance(get, aiohttp.ClientResponse)
-            resp = await get.json()
-            await ctx.send(resp["joke"])
+        await ctx.send(await self.bot.prefetcher.get("joke"))
 
     @commands.command()
     async def lenny(self, ctx):
         """Lenny faces!"""
-        async with self.bot.session.get("http://lenny.today/api/v1/random") as get:
-            assert isinstance(get, aiohttp.ClientResponse)
-            lenny = await get.json()
-            await ctx.send(lenny[0]["face"])
+        await ctx.send(await self.bot.prefetcher.get("lenny"))
 
     @commands.command()
     async def xkcd(self, ctx, query: int = None):
@@ -138,18 +123,21 @@ class Fun:
             em.title = "\N{CROSS MARK} Error"
             em.description = "Error 404: Comic Not Found"
             return await ctx.send(embed=em)
-        latest_comic = xkcd.getLatestComicNum()
+        async with self.bot.session.get("https://xkcd.com/info.0.json", ttl=600) as get:
+            latest_comic = (await get.json())["num"]
         if query:
             query_req = 1 <= int(query) <= int(latest_comic)
             if query_req:
-                comic = xkcd.getComic(query)
+                comic = await ctx.bot.loop.run_in_executor(None, xkcd.getComic, query)
             else:
                 em = discord.Embed(color=discord.Color.red())
                 em.title = "\N{CROSS MARK} Error"
                 em.description = f"It has to be between 1 and {str(latest_comic)}!"
                 return await ctx.send(embed=em)
         else:
-            comic = xkcd.getRandomComic()
+            number = random.randint(1, latest_comic - 1)
+            number += number >= 404  # there is no comic 404
+            comic = await ctx.bot.loop.run_in_executor(None, xkcd.getComic, number)
         embed = discord.Embed(title=f"xkcd {comic.number}: {comic.title}", url=comic.link)
 
         embed.set_image(url=comic.imageLink)
@@ -300,6 +288,46 @@ class Fun:
             line = random.choice(self.rules)
         await ctx.send(line)
 
+    async def fetch_inspiro(self):
+        """Fetches an inspiring image for the prefetcher"""
+        async with self.bot.session.get("https://inspirobot.me/api?generate=true") as get:
+            assert isinstance(get, aiohttp.ClientResponse)
+            url = str(await get.read(), encoding='utf8')
+        return await utils.get_file(self.bot, url, content_types=utils.IMAGE_TYPES), url
+
+    async def fetch_randomfacts(self):
+        """Fetches three random facts for the prefetcher"""
+        async with self.bot.session.get("http://randomfactgenerator.net/") as get:
+            assert isinstance(get, aiohttp.ClientResponse)
+            _html = await get.read()
+        html = BSoup(_html, 'html.parser')
+        facts = []
+        for fact in html.find_all(id="z"):
+            facts.append(fact.contents[0])
+        return (f"Did you know?\n"
+                f"\t1. {facts[0]}\n"
+                f"\t2. {facts[1]}\n"
+                f"\t3. {facts[2]}")
+
+    async def fetch_joke(self):
+        """Fetches a dad joke for the prefetcher"""
+        headers = {"Accept": "application/json"}
+        async with self.bot.session.get("https://icanhazdadjoke.com", headers=headers) as get:
+            assert isinstance(get, aiohttp.ClientResponse)
+            resp = await get.json()
+        return resp["joke"]
+
+    async def fetch_lenny(self):
+        """Fetches a lenny face for the prefetcher"""
+        async with self.bot.session.get("http://lenny.today/api/v1/random") as get:
+            assert isinstance(get, aiohttp.ClientResponse)
+            lenny = await get.json()
+        return lenny[0]["face"]
+
+    def __unload(self):
+        for name in ("inspiro", "randomfacts", "joke", "lenny"):
+            self.bot.prefetcher.unregister(name)
+
 
 def setup(bot: Bot):
     """Setup function for the cog"""
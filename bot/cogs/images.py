@@ -1,7 +1,7 @@
 # coding=utf-8
 """File containing image related commands for the bot"""
+import functools
 import io
-import random
 import re
 from urllib.parse import quote_plus
 
@@ -9,9 +9,11 @@ import aiohttp
 import discord
 from discord.ext import commands
 from bot.main import Bot
-from bot.utils import utils
+from bot.utils import imaging, tombstone, utils
+from bot.utils.assets import AssetRegistry, AssetStore, optimized_variants
+from bot.utils.browser import PagePoolTimeout
+from bot.utils.cache import TieredCache, cache_key
 from datetime import datetime as d
-from PIL import Image
 import base64
 
 
@@ -19,6 +21,19 @@ class Images:
     """Cog containing image related commands for the bot"""
     def __init__(self, bot: Bot):
         self.bot = bot
+        cache = bot.config['extras'].get('rip_cache', {})
+        self.rip_cache = TieredCache(bot.loop, cache.get('path', 'cache/rip'), max_entries=cache.get('memory', 64),
+                                     max_bytes=cache.get('disk_bytes', 64 * 1024 * 1024))
+        self.rip_config = bot.config['extras'].get('rip', {})
+        assets = bot.config['extras'].get('assets', {})
+        self.assets = AssetRegistry(bot, path=assets.get('path', 'cache/assets.json'), channel_id=assets.get('channel'),
+                                    revalidate=assets.get('revalidate', 3600))
+        self.reactions = AssetStore(variants=optimized_variants())
+        bot.logger.info(f"Loaded {len(self.reactions)} reaction assets ({self.reactions.footprint} bytes)")
+        size = bot.config['extras'].get('prefetch', {}).get('size', 3)
+        bot.prefetcher.register("cat", self.fetch_cat, size=size, skip=(utils.DownloadError,))
+        bot.prefetcher.register("dog", self.fetch_dog, size=size, skip=(utils.DownloadError,))
+        bot.prefetcher.register("bird", self.fetch_bird, size=size, skip=(utils.DownloadError,))
 
     @commands.command(aliases=["tombstone"])
     async def rip(self, ctx, user: discord.User = None, *, epitaph: str = ""):
@@ -30,33 +45,36 @@ class Images:
             pass
         death = f"{user.created_at.strftime('%e %b, %Y')} to {d.now().strftime('%e %b, %Y')}"
         epitaph = epitaph + f": {death}" if epitaph else death
-        str_to_encrypt = f"n={user.display_name}&e={epitaph}".encode()
+        renderer = self.rip_config.get('renderer', 'local')
+        key = cache_key(renderer, user.display_name, epitaph)
+        data = await self.rip_cache.get(key)
+        if data is None:
+            try:
+                if renderer == 'browser':
+                    data = await self.browser_tombstone(user.display_name, epitaph)
+                else:
+                    render = functools.partial(tombstone.render, user.display_name, epitaph,
+                                               font=self.rip_config.get('font', 'DejaVuSans.ttf'))
+                    data = await self.bot.loop.run_in_executor(None, render)
+            except PagePoolTimeout:
+                return await ctx.send("I can't carve a tombstone right now, try again in a bit!")
+            await self.rip_cache.put(key, data)
+        await ctx.send(file=discord.File(fp=io.BytesIO(data), filename="rip.png"))
+
+    async def browser_tombstone(self, name: str, epitaph: str) -> bytes:
+        """Renders a tombstone through oregontrailtombstone.com, returning the keyed PNG"""
+        if self.bot.page_pool is None:
+            raise PagePoolTimeout("The browser hasn't started yet")
+        str_to_encrypt = f"n={name}&e={epitaph}".encode()
         encrypted = base64.encodebytes(str_to_encrypt).decode()  # Encode parameters to base64
         url = f"http://www.oregontrailtombstone.com/tombstone.php?p={encrypted}"
 
-        page = self.bot.browser_page
-        if page is None:
-            await self.bot.create_browser()
-        await page.goto(url)
-        tombstone = (await page.JJ('div'))[1]  # Select second page div containing the tombstone image
-        file = await tombstone.screenshot({"type": "png"})
-
-        im = Image.open(io.BytesIO(file))
-        im = im.convert('RGBA')
-
-        datas = im.getdata()
-        new_data = []
-        for item in datas:
-            if item[0] == 0 and item[1] == 0 and item[2] == 0:
-                new_data.append((0, 0, 0, 0))
-            else:
-                new_data.append(item)
+        async with self.bot.page_pool.lease() as page:
+            await page.goto(url)
+            tombstone = (await page.JJ('div'))[1]  # Select second page div containing the tombstone image
+            file = await tombstone.screenshot({"type": "png"})
 
-        im.putdata(new_data)
-        img_array = io.BytesIO()
-        im.save(img_array, format="PNG")
-        file = img_array.getvalue()
-        await ctx.send(file=discord.File(fp=io.BytesIO(file), filename="rip.png"))
+        return (await imaging.run(self.bot.loop, file, imaging.key_out_black)).getvalue()
 
     @commands.command()
     async def color(self, ctx, *, color: str):
@@ -75,14 +93,14 @@ class Images:
         else:
             return await ctx.send("Sorry, but that is not a valid rgb or hex color.")
         color_api = "http://thecolorapi.com/id?"
-        async with self.bot.session.get(color_api, params=attrs) as get:
+        async with self.bot.session.get(color_api, params=attrs, ttl=86400) as get:
             resp = await get.json()
         hex_code = str(resp["hex"]["clean"])
         contrast = str(resp["contrast"]["value"]).strip("#")
         name = str(resp["name"]["value"])
         image = f"http://placehold.it/300x300.png/{hex_code}/{contrast}&text={name}"
-        pic = await utils.get_file(self.bot, image)
-        await ctx.send(file=discord.File(fp=io.BytesIO(pic), filename="color.png"))
+        pic = await utils.get_file(self.bot, image, content_types=utils.IMAGE_TYPES)
+        await ctx.send(file=discord.File(fp=pic, filename="color.png"))
         
     @commands.command()
     async def shoot(self, ctx, member: discord.User = None):
@@ -91,35 +109,18 @@ class Images:
             return await ctx.send("You gotta give me someone to work with here!")
 
         if member == self.bot.user:
-            gif = random.choice([
-                "bot/files/gun_dodge1.gif",
-                "bot/files/gun_dodge2.gif",
-                "bot/files/gun_dodge3.gif"
-            ])
+            asset = self.reactions.choice("gun", "dodge")
             message = f"You attempted to shoot me, {ctx.author.name}, but I dodged it!"
 
         elif member == ctx.author:
-            gif = random.choice([
-                "bot/files/gun_suicide1.gif",
-                "bot/files/gun_suicide2.gif",
-                "bot/files/gun_suicide3.gif",
-                "bot/files/gun_suicide4.gif"
-            ])
+            asset = self.reactions.choice("gun", "suicide")
             message = f"{ctx.author.name} committed suicide!"
 
         else:
-            gif = random.choice([
-                "bot/files/gun_shooting1.gif",
-                "bot/files/gun_shooting2.gif",
-                "bot/files/gun_shooting3.gif",
-                "bot/files/gun_shooting4.gif",
-                "bot/files/gun_shooting5.gif",
-                "bot/files/gun_shooting6.gif",
-                "bot/files/gun_shooting7.gif"
-            ])
+            asset = self.reactions.choice("gun", "hit")
             message = f"{member.name} was shot dead by the mighty {ctx.author.name}!"
 
-        await ctx.send(message, file=discord.File(gif, filename=gif.split("/")[-1]))
+        await self.assets.send(ctx, asset, message)
 
     @commands.command()
     async def stab(self, ctx, member: discord.User = None):
@@ -128,32 +129,18 @@ class Images:
             return await ctx.send("You gotta give me someone to work with here!")
 
         if member == self.bot.user:
-            gif = random.choice([
-                "bot/files/stab_dodge1.gif",
-                "bot/files/stab_dodge2.webp",
-                "bot/files/stab_dodge3.gif",
-                "bot/files/stab_dodge4.gif"
-            ])
+            asset = self.reactions.choice("stab", "dodge")
             message = f"You attempted to stab me, {ctx.author.name}, but I dodged it!"
 
         elif member == ctx.author:
-            gif = random.choice([
-                "bot/files/stab_suicide1.gif",
-                "bot/files/stab_suicide2.gif",
-                "bot/files/stab_suicide3.gif"
-            ])
+            asset = self.reactions.choice("stab", "suicide")
             message = f"{ctx.author.name} died to their own blade!"
 
         else:
-            gif = random.choice([
-                "bot/files/stab_stabbing1.gif",
-                "bot/files/stab_stabbing2.gif",
-                "bot/files/stab_stabbing3.gif",
-                "bot/files/stab_stabbing4.gif"
-            ])
+            asset = self.reactions.choice("stab", "hit")
             message = f"{member.name} was stabbed to death by the mighty {ctx.author.name}!"
 
-        await ctx.send(message, file=discord.File(gif, filename=gif.split("/")[-1]))
+        await self.assets.send(ctx, asset, message)
 
     @commands.command()
     async def punch(self, ctx, member: discord.User = None):
@@ -162,34 +149,18 @@ class Images:
             return await ctx.send("You gotta give me someone to work with here!")
 
         if member == self.bot.user:
-            gif = random.choice([
-                "bot/files/punch_dodge1.gif",
-                "bot/files/punch_dodge2.gif",
-                "bot/files/punch_dodge3.gif",
-                "bot/files/punch_dodge4.gif",
-                "bot/files/punch_dodge5.gif"
-            ])
+            asset = self.reactions.choice("punch", "dodge")
             message = f"You attempted to punch me, {ctx.author.name}, but I dodged it!"
 
         elif member == ctx.author:
-            gif = random.choice([
-                "bot/files/punch_self1.gif",
-                "bot/files/punch_self2.gif",
-                "bot/files/punch_self3.gif"
-            ])
+            asset = self.reactions.choice("punch", "suicide")
             message = f"{ctx.author.name} punched their self!"
 
         else:
-            gif = random.choice([
-                "bot/files/punch_punch1.gif",
-                "bot/files/punch_punch2.gif",
-                "bot/files/punch_punch3.gif",
-                "bot/files/punch_punch4.gif",
-                "bot/files/punch_punch5.gif"
-            ])
+            asset = self.reactions.choice("punch", "hit")
             message = f"{member.name} was punched by the mighty {ctx.author.name}!"
 
-        await ctx.send(message, file=discord.File(gif, filename=gif.split("/")[-1]))
+        await self.assets.send(ctx, asset, message)
 
     @commands.command()
     async def robohash(self, ctx, *, string: str = None):
@@ -197,38 +168,55 @@ class Images:
         if string is None:
             string = ctx.author.display_name
         url = f"https://robohash.org/{quote_plus(string)}.png"
-        file = await utils.get_file(self.bot, url)
-        await ctx.send(file=discord.File(fp=io.BytesIO(file), filename="robot.png"))
+        file = await utils.get_file(self.bot, url, content_types=utils.IMAGE_TYPES)
+        await ctx.send(file=discord.File(fp=file, filename="robot.png"))
 
     @commands.command(aliases=["meow"])
     async def cat(self, ctx):
         """A random cat!"""
+        file, filename = await self.bot.prefetcher.get("cat")
+        await ctx.send(file=discord.File(filename=filename, fp=file))
+
+    @commands.command(aliases=["woof"])
+    async def dog(self, ctx):
+        """A random dog!"""
+        file, filename = await self.bot.prefetcher.get("dog")
+        await ctx.send(file=discord.File(filename=filename, fp=file))
+
+    @commands.command(aliases=["birb", "tweet"])
+    async def bird(self, ctx):
+        """A random bird!"""
+        file, filename = await self.bot.prefetcher.get("bird")
+        await ctx.send(file=discord.File(filename=filename, fp=file))
+
+    async def fetch_cat(self):
+        """Fetches a random cat for the prefetcher"""
         async with self.bot.session.get("http://aws.random.cat/meow") as get:
             assert isinstance(get, aiohttp.ClientResponse)
             json = await get.json()
         file = await utils.get_file(self.bot, json["file"])
         ext = str(json["file"]).split(".")[-1]
-        await ctx.send(file=discord.File(filename=f"cat.{ext}", fp=io.BytesIO(file)))
+        return file, f"cat.{ext}"
 
-    @commands.command(aliases=["woof"])
-    async def dog(self, ctx):
-        """A random dog!"""
+    async def fetch_dog(self):
+        """Fetches a random dog for the prefetcher"""
         async with self.bot.session.get("http://random.dog/woof") as get:
             assert isinstance(get, aiohttp.ClientResponse)
             _url = (await get.read()).decode("utf-8")
             url = f"http://random.dog/{str(_url)}"
-        file = await utils.get_file(self.bot, url)
-        await ctx.send(file=discord.File(filename=_url, fp=io.BytesIO(file)))
+        return await utils.get_file(self.bot, url), _url
 
-    @commands.command(aliases=["birb", "tweet"])
-    async def bird(self, ctx):
-        """A random bird!"""
+    async def fetch_bird(self):
+        """Fetches a random bird for the prefetcher"""
         async with self.bot.session.get("http://random.birb.pw/tweet/") as get:
             assert isinstance(get, aiohttp.ClientResponse)
             _url = (await get.read()).decode("utf-8")
             url = f"http://random.birb.pw/img/{str(_url)}"
-        file = await utils.get_file(self.bot, url)
-        await ctx.send(file=discord.File(filename=_url, fp=io.BytesIO(file)))
+        return await utils.get_file(self.bot, url), _url
+
+    def __unload(self):
+        for name in ("cat", "dog", "bird"):
+            self.bot.prefetcher.unregister(name)
 
 
 def setup(bot: Bot):
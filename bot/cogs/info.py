@@ -12,6 +12,7 @@ import discord
 from discord.ext import commands
 
 from bot.main import Bot
+from bot.utils.stats import Window
 from bot.utils.utils import SourceEntity, InviteUserGuild, neatly
 
 
@@ -94,7 +95,7 @@ class Info:
         """Gets information about a Discord user."""
         if user is None:
             user = ctx.author
-        shared = str(len([i for i in ctx.bot.guilds if i.get_member(user.id)]))
+        shared = str(self.bot.population.shared(user.id))
         em = discord.Embed(title=f'Information for {user.display_name}:')
         em.add_field(name='Name:', value=user.name)
         em.add_field(name='Discriminator:', value=user.discriminator)
@@ -107,8 +108,8 @@ class Info:
         await ctx.send(embed=em)
 
     @commands.group(invoke_without_command=True, aliases=["stats"])
-    async def about(self, ctx):
-        """Gives information about the bot."""
+    async def about(self, ctx, window: Window = ("all", None)):
+        """Gives information about the bot, with command usage from the last 24h, 7d or all time."""
         revision = self.bot.revisions
         owner = self.bot.app_info.owner
         seconds = time.time() - self.bot.start_time
@@ -116,8 +117,6 @@ class Info:
         h, m = divmod(m, 60)
         d, h = divmod(h, 24)
         w, d = divmod(d, 7)
-        unique_members = set(self.bot.get_all_members())
-        unique_online = sum(1 for m in unique_members if m.status != discord.Status.offline)
         perms = discord.Permissions(470150343)
         url = discord.utils.oauth_url(self.bot.app_info.id, perms)
 
@@ -135,8 +134,8 @@ class Info:
                 most_used = "None"
             return most_used
 
-        cmd_used, cmd_used_in = calc_max_values(self.bot.commands_used, "commands"), \
-            calc_max_values(self.bot.commands_used_in, "servers", "commands run")
+        cmd_used, cmd_used_in = calc_max_values(await self.bot.stats.by_command(window[1]), "commands"), \
+            calc_max_values(self.guild_names(await self.bot.stats.by_guild(window[1])), "servers", "commands run")
         u_s = "s" if len(cmd_used.split(",")) > 1 else ""
         ui_s = "s" if len(cmd_used_in.split(",")) > 1 else ""
         em = discord.Embed(description=str('**Latest Changes:**\n' + revision) if revision else None)
@@ -149,11 +148,20 @@ class Info:
                                             f"{sys.version_info[2]})")
         em.add_field(name="Servers:", value=str(len(ctx.bot.guilds)))
         em.add_field(name="Up-time:", value=f"{int(w)}w : {int(d)}d : {int(h)}h : {int(m)}m : {int(s)}s")
-        em.add_field(name="Total Unique Users:", value=f"{len(unique_members)} ({unique_online} online)")
-        em.add_field(name=f"Most Used Command{u_s}", value=str(cmd_used))
-        em.add_field(name=f"Most Active Server{ui_s}", value=str(cmd_used_in))
+        population = self.bot.population
+        em.add_field(name="Total Unique Users:", value=f"{population.users} ({population.users_online} online)")
+        em.add_field(name=f"Most Used Command{u_s} ({window[0]})", value=str(cmd_used))
+        em.add_field(name=f"Most Active Server{ui_s} ({window[0]})", value=str(cmd_used_in))
         await ctx.send(embed=em)
 
+    def guild_names(self, c: Counter):
+        """Replace guild IDs in a Counter with names"""
+        names = Counter()
+        for guild_id, uses in c.items():
+            guild = self.bot.get_guild(guild_id)
+            names["PMs" if guild_id == 0 else guild.name if guild else f"Unknown Server ({guild_id})"] += uses
+        return names
+
     @staticmethod
     def calc_popularity(c: Counter, msg: str = None):
         """Calculate the popularity of items in a Counter"""
@@ -167,17 +175,18 @@ class Info:
         return cmd_msg
 
     @about.command(name="commands")
-    async def about_commands(self, ctx):
-        """Gives info on how many commands have been used."""
-        em = discord.Embed(title="Command Statistics", description=neatly(
-            entries=self.calc_popularity(self.bot.commands_used), colors="autohotkey"))
+    async def about_commands(self, ctx, window: Window = ("all", None)):
+        """Gives info on how many commands have been used in the last 24h, 7d or all time."""
+        em = discord.Embed(title=f"Command Statistics ({window[0]})", description=neatly(
+            entries=self.calc_popularity(await self.bot.stats.by_command(window[1])), colors="autohotkey"))
         await ctx.send(embed=em)
 
     @about.command(name="servers", aliases=["guilds"])
-    async def about_servers(self, ctx):
-        """Gives info on the most popular servers by command usage"""
-        em = discord.Embed(title="Server Statistics", description=neatly(
-            entries=self.calc_popularity(self.bot.commands_used_in), colors="autohotkey"))
+    async def about_servers(self, ctx, window: Window = ("all", None)):
+        """Gives info on the most popular servers by command usage in the last 24h, 7d or all time"""
+        em = discord.Embed(title=f"Server Statistics ({window[0]})", description=neatly(
+            entries=self.calc_popularity(self.guild_names(await self.bot.stats.by_guild(window[1]))),
+            colors="autohotkey"))
         await ctx.send(embed=em)
 
     @commands.command()
@@ -1,7 +1,6 @@
 # coding=utf-8
 """Meme commands for the bot"""
 import aiohttp
-import io
 
 import discord
 from discord.ext import commands
@@ -33,8 +32,8 @@ class Meme:
         """
         style = f"?alt={style}" or ""
         link = f"http://memegen.link/{meme}/{line1}/{line2}.jpg{style}"
-        file = await utils.get_file(self.bot, link)
-        await ctx.send(file=discord.File(fp=io.BytesIO(file), filename="meme.png"))
+        file = await utils.get_file(self.bot, link, content_types=utils.IMAGE_TYPES)
+        await ctx.send(file=discord.File(fp=file, filename="meme.png"))
 
     @meme.command(name="custom")
     async def meme_custom(self, ctx, link: str, line1: URLString, line2: URLString):
@@ -45,8 +44,8 @@ class Meme:
             type_split = content.split("/")
             if type_split[0] == "image" and type_split[1] in ["png", "jpeg", "bmp"]:
                 link = f"http://memegen.link/custom/{line1}/{line2}.jpg?alt={link}"
-                file = await utils.get_file(self.bot, link)
-                await ctx.send(file=discord.File(fp=io.BytesIO(file), filename="meme.png"))
+                file = await utils.get_file(self.bot, link, content_types=utils.IMAGE_TYPES)
+                await ctx.send(file=discord.File(fp=file, filename="meme.png"))
             else:
                 await ctx.send("Only jpeg, png, or bmp images please!")
 
@@ -58,7 +57,7 @@ class Meme:
     @meme.group(name="templates", invoke_without_command=True)
     async def meme_templates(self, ctx):
         """Gives users a list of meme templates."""
-        async with self.bot.session.get("http://memegen.link/templates/") as resp:
+        async with self.bot.session.get("http://memegen.link/templates/", ttl=86400) as resp:
             resp = await resp.json()
         memes = [resp[key][35:] for key in resp]
         await ctx.send(f"All stock templates are: {', '.join(memes)}")
@@ -5,26 +5,51 @@ from discord.ext import commands
 from bot.main import Bot
 
 from bot.utils import checks
+from bot.utils.bulk import BulkAction
+from bot.utils.ratelimit import TokenBucket
 
 
 class Mod:
     """Cog containing moderation commands for the bot"""
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.bulk_config = self.bot.config['extras'].get('moderation', {})
+        self.buckets = {}
+
+    def bulk(self, ctx, verb: str, action) -> BulkAction:
+        """Creates a bulk action, paced by the guild's token bucket if a rate is configured"""
+        bucket = None
+        rate = self.bulk_config.get('rate')
+        if rate:
+            # Full buckets are no different from new ones, so drop them rather than keep one for every guild
+            for guild_id in [guild_id for guild_id, old in self.buckets.items() if old.idle]:
+                del self.buckets[guild_id]
+            bucket = self.buckets.get(ctx.guild.id)
+            if bucket is None:
+                bucket = self.buckets[ctx.guild.id] = TokenBucket(rate, self.bulk_config.get('per', 1))
+        return BulkAction(verb, action, concurrency=self.bulk_config.get('concurrency', 4), bucket=bucket)
+
+    def describe_id(self, user_id: int) -> str:
+        """Names a user by ID for bulk action summaries, without fetching them"""
+        user = self.bot.get_user(user_id)
+        return f"{user} (ID: {user_id})" if user else str(user_id)
 
     @commands.command()
     @commands.guild_only()
     @checks.has_permissions(manage_guild=True)
     @checks.bot_has_permissions(manage_guild=True)
-    async def listbans(self, ctx):
+    async def listbans(self, ctx, page: int = 1):
         """
-        Lists the current bans on the server.
+        Lists the current bans on the server, 20 per page.
         """
-        bans = await ctx.guild.bans()
+        bans = await self.bot.bans.get(ctx.guild)
         if len(bans) == 0:
-            await ctx.send("There are no active bans currently on the server.")
-        else:
-            await ctx.send(f"The currently active bans for this server are: {', '.join(map(str, bans))}")
+            return await ctx.send("There are no active bans currently on the server.")
+        pages = (len(bans) + 19) // 20
+        if not 1 <= page <= pages:
+            return await ctx.send(f"There are only {pages} page{'s' if pages > 1 else ''} of bans!")
+        lines = "\n".join(f"{user} (ID: {user.id})" for user, _ in bans.page(page))
+        await ctx.send(f"Active bans for this server (page {page}/{pages}, {len(bans)} total):\n```\n{lines}\n```")
 
     @commands.command()
     @commands.guild_only()
@@ -34,12 +59,7 @@ class Mod:
         """
         Kicks the member of choice.
         """
-        for member in members:
-            try:
-                await ctx.guild.kick(member)
-                await ctx.send(f"{member.name} was kicked from the server.")
-            except discord.errors.Forbidden:
-                await ctx.send(f"Skipping `{member}`, permissions error.")
+        await self.bulk(ctx, "kicked", ctx.guild.kick).run(ctx, members)
 
     @commands.command()
     @commands.guild_only()
@@ -49,18 +69,13 @@ class Mod:
         """
         Kicks a member and deletes {days} days of their messages. Defaults to 7.
         """
-        softbanned = 0
-        for member in members:
-            try:
-                await ctx.guild.ban(member, delete_message_days=days)
-                await ctx.guild.unban(member)
-                softbanned += 1
-            except discord.errors.DiscordException as e:
-                try:
-                    await ctx.send(f"User `{str(member)}` (ID: `{member.id}`) could not be softbanned: `{e}`")
-                except discord.errors.DiscordException as err:
-                    await ctx.send(f"User `{member}` could not be softbanned: `{err}`")
-        await ctx.send(f"Successfully softbanned {softbanned}/{len(members)} users")
+
+        async def softban_member(member):
+            """Bans and unbans a member"""
+            await ctx.guild.ban(member, delete_message_days=days)
+            await ctx.guild.unban(member)
+
+        await self.bulk(ctx, "softbanned", softban_member).run(ctx, members)
 
     @commands.command()
     @commands.guild_only()
@@ -70,17 +85,7 @@ class Mod:
         """
         Bans a member and deletes their messages.
         """
-        banned = 0
-        for member in members:
-            try:
-                await ctx.guild.ban(member, delete_message_days=7)
-                banned += 1
-            except discord.errors.DiscordException as e:
-                try:
-                    await ctx.send(f"User `{str(member)}` (ID: `{member.id}`) could not be banned: `{e}`")
-                except discord.errors.DiscordException as err:
-                    await ctx.send(f"User `{member}` could not be banned: `{err}`")
-        await ctx.send(f"Successfully banned {banned}/{len(members)} users")
+        await self.bulk(ctx, "banned", lambda member: ctx.guild.ban(member, delete_message_days=7)).run(ctx, members)
 
     @commands.command()
     @commands.guild_only()
@@ -88,14 +93,26 @@ class Mod:
     @checks.bot_has_permissions(ban_members=True)
     async def unban(self, ctx, *, name: str):
         """
-        Unbans a member.
+        Unbans a member by ID, name#discriminator or name.
         """
-        bans = await ctx.guild.bans()
-        member = discord.utils.get(bans, user__name=name)
-        if member:
-            await ctx.guild.unban(member.user)
-            await ctx.send(f"{str(member.user)} has been unbanned from the server!")
+        bans = (await self.bot.bans.get(ctx.guild)).find(name)
+        if len(bans) > 1:
+            return await ctx.send(f"{len(bans)} banned users are named {name}, use their name#discriminator or ID!")
+        if bans:
+            user, _ = bans[0]
+            await ctx.guild.unban(user)
+            await ctx.send(f"{str(user)} has been unbanned from the server!")
             return
+        if name.isdigit():
+            # The index may have missed a ban, ask Discord directly before giving up
+            try:
+                ban = await ctx.guild.get_ban(discord.Object(id=int(name)))
+            except discord.NotFound:
+                pass
+            else:
+                await ctx.guild.unban(ban.user)
+                await ctx.send(f"{str(ban.user)} has been unbanned from the server!")
+                return
         await ctx.send("You can't unban a member that hasn't been banned!")
 
     @commands.command()
@@ -106,18 +123,8 @@ class Mod:
         """
         Preemptive bans a user.
         """
-        banned = 0
-        for user_id in user_ids:
-            try:
-                await ctx.guild.ban(discord.Object(id=user_id))
-                banned += 1
-            except discord.errors.DiscordException as e:
-                try:
-                    user = await ctx.bot.get_user_info(user_id)
-                    await ctx.send(f"User `{str(user)}` (ID: `{user.id}`) could not be banned: `{e}`")
-                except discord.errors.DiscordException as err:
-                    await ctx.send(f"User `{user_id}` could not be banned: `{err}`")
-        await ctx.send(f"Successfully banned {banned}/{len(user_ids)} users")
+        await self.bulk(ctx, "banned", lambda user_id: ctx.guild.ban(discord.Object(id=user_id))).run(
+            ctx, user_ids, describe=self.describe_id)
 
     @commands.command()
     @commands.guild_only()
@@ -9,8 +9,10 @@ from contextlib import redirect_stdout
 
 import discord
 from discord.ext import commands
+from tabulate import tabulate
 
 from bot.main import Bot
+from bot.utils.metrics import STAGES
 
 
 # noinspection PyBroadException,PyBroadException,PyBroadException,PyBroadException,PyBroadException,PyBroadException
@@ -200,6 +202,7 @@ class Owner:
         except Exception:
             await ctx.send(f'```py\n{traceback.format_exc()}\n```')
         else:
+            self.bot.formatter.invalidate()
             await ctx.send(f'Loaded {_module}')
 
     @commands.command()
@@ -211,6 +214,7 @@ class Owner:
         except Exception:
             await ctx.send(f'```py\n{traceback.format_exc()}\n```')
         else:
+            self.bot.formatter.invalidate()
             await ctx.send(f'Unloaded {_module}')
 
     @commands.group(invoke_without_command=True)
@@ -221,8 +225,10 @@ class Owner:
             self.bot.unload_extension(_module)
             self.bot.load_extension(_module)
         except Exception:
+            self.bot.formatter.invalidate()
             await ctx.send(f'```py\n{traceback.format_exc()}\n```')
         else:
+            self.bot.formatter.invalidate()
             await ctx.send(f'Reloaded {_module}')
 
     @reload.command(name='all')
@@ -239,8 +245,23 @@ class Owner:
                 await ctx.send(f'Could not reload `{extension}` -> `{e}`')
             await asyncio.sleep(1)
 
+        self.bot.formatter.invalidate()
         await ctx.send(f'Reloaded {counter}/{ext} extensions.')
 
+    @commands.command()
+    async def metrics(self, ctx, stage: str = 'total'):
+        """Shows the slowest commands by 95th percentile latency."""
+        if stage not in STAGES:
+            return await ctx.send(f"Stage must be one of {', '.join(STAGES)}!")
+        rows = [(command, uses, *(f'{s * 1000:.0f}ms' for s in latencies), errors, timeouts)
+                for command, uses, *latencies, errors, timeouts in self.bot.metrics.summary(stage)]
+        if not rows:
+            return await ctx.send("No commands have been run yet!")
+        table = tabulate(rows, headers=('Command', 'Uses', 'p50', 'p95', 'p99', 'Max', 'Errors', 'Timeouts'))
+        permissions = self.bot.permissions.stats
+        await ctx.send(f'```\n{table}\n\nPermission cache: {permissions["hits"]} hits, {permissions["misses"]} misses, '
+                       f'{permissions["invalidations"]} invalidations, {permissions["entries"]} entries\n```')
+
     @commands.command(aliases=['dm'])
     async def reply(self, ctx, user: discord.User, *, reason: str):
         """DMs a user."""
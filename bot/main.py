@@ -2,18 +2,31 @@
 """Main bot file"""
 import aiohttp
 import time
-from collections import Counter, deque
+from collections import deque
 from pathlib import Path
 
 import discord
 from discord.ext import commands
 from pyppeteer import launch, errors
 
-from bot.utils.logging import setup_logger
+from bot.utils.bans import BanIndex
+from bot.utils.browser import PagePool
+from bot.utils.checks import PermissionCache, RoleIndex
+from bot.utils.httpcache import CachingSession
+from bot.utils.logging import LogPipeline, setup_logger
+from bot.utils.metrics import CommandMetrics, can_run, parse_arguments
 from bot.utils.over import send, _default_help_command
+from bot.utils.overflow import Overflow
+from bot.utils.polr import Polr
+from bot.utils.population import PopulationIndex
+from bot.utils.prefetch import Prefetcher
+from bot.utils.privatebin import PrivateBin
+from bot.utils.stats import CommandStats
 
 
 discord.abc.Messageable.send = send
+commands.Command.can_run = can_run
+commands.Command._parse_arguments = parse_arguments
 
 
 class Bot(commands.AutoShardedBot):
@@ -32,20 +45,46 @@ class Bot(commands.AutoShardedBot):
         shard = f"| Shard {self.shard_id}" if self.shard_id else ""
         self.activity = discord.Game(name=f"{self.command_prefix}help {shard}")
 
-        self.session = aiohttp.ClientSession(loop=self.loop, headers={"User-Agent": self.http.user_agent})
-        self.browser_page = None
-        self.browser = self.loop.create_task(self.create_browser())
-        self.priv = self.config['extras'].get('privatebin', 'https://privatebin.net')
-        self.polr = self.config['extras'].get('polr', None)
+        http_cache = self.config['extras'].get('http_cache', {})
+        session = aiohttp.ClientSession(loop=self.loop, headers={"User-Agent": self.http.user_agent})
+        self.session = CachingSession(session, ttls=http_cache.get('ttls'),
+                                      max_bytes=http_cache.get('max_bytes', 8 * 1024 * 1024))
+        self.page_pool = None
+        self.browser = None
+        if self.config['extras'].get('rip', {}).get('renderer', 'local') == 'browser':
+            self.loop.create_task(self.create_browser())
+        prefetch = self.config['extras'].get('prefetch', {})
+        self.prefetcher = Prefetcher(self.loop, max_bytes=prefetch.get('max_bytes', 32 * 1024 * 1024))
+        paste = self.config['extras'].get('paste', {})
+        self.privatebin = PrivateBin(self.config['extras'].get('privatebin', 'https://privatebin.net'),
+                                     session=self.session, loop=self.loop, concurrency=paste.get('concurrency', 4),
+                                     rate=paste.get('rate', 1), per=paste.get('per', 10),
+                                     processes=paste.get('processes', 0))
+        overflow = self.config['extras'].get('overflow', {})
+        self.overflow = Overflow(self, max_messages=overflow.get('max_messages', 3),
+                                 max_file=overflow.get('max_file', 4 * 1024 * 1024))
+        polr = self.config['extras'].get('polr', None)
+        self.polr = Polr(**polr, session=self.session) if polr else None
 
-        self.commands_used = Counter()
-        self.commands_used_in = Counter()
+        stats = self.config['extras'].get('stats', {})
+        self.stats = CommandStats(self.loop, stats.get('path', 'cache/stats.db'),
+                                  flush_interval=stats.get('flush_interval', 60))
         self.errors = deque(maxlen=10)
+        self.metrics = CommandMetrics()
+        self.population = PopulationIndex()
+        self.roles = RoleIndex()
+        self.bans = BanIndex(ttl=self.config['extras'].get('bans', {}).get('ttl', 3600))
+        self.permissions = PermissionCache(self.config['extras'].get('permissions', {}).get('max_entries', 4096))
+        metrics = self.config['extras'].get('metrics', None)
+        if metrics:
+            self.loop.create_task(self.metrics.serve(metrics.get('host', '127.0.0.1'), metrics.get('port', 9100)))
         self.revisions = None
 
-        discord_logger = setup_logger("discord")
-        self.logger = setup_logger("Bot")
-        self.command_logger = setup_logger("Commands")
+        log = self.config['extras'].get('logging', {})
+        self.log_pipeline = LogPipeline(queued=log.get('queue', False), json_path=log.get('json'))
+        discord_logger = setup_logger("discord", self.log_pipeline)
+        self.logger = setup_logger("Bot", self.log_pipeline)
+        self.command_logger = setup_logger("Commands", self.log_pipeline, sample=log.get('command_sample'))
         self.loggers = [discord_logger, self.logger, self.command_logger]
 
         _modules = [mod.stem for mod in Path("bot/cogs").glob("*.py")]
@@ -77,25 +116,43 @@ class Bot(commands.AutoShardedBot):
             self.logger.info(f"Bot started in {end_time} seconds")
             self._loaded = True
             return
+        # Events were missed while disconnected, so indexed bans can't be trusted
+        self.bans.clear()
         self.logger.info(f"Resumed bot session on shard {self.shard_id}!")
 
+    async def invoke(self, ctx):
+        """Invokes the command given under the invocation context, timing it"""
+        ctx.timings = {}
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            self.metrics.invoked(ctx, time.perf_counter() - start)
+
     async def create_browser(self):
         """Task to create browser for scraping purposes."""
         await self.wait_until_ready()
         self.browser = await launch(args=["--no-sandbox"], headless=True)
-        self.browser_page = await self.browser.newPage()
+        pool = self.config['extras'].get('browser', {})
+        self.page_pool = PagePool(self.browser, size=pool.get('pages', 3), max_uses=pool.get('max_uses', 50),
+                                  timeout=pool.get('timeout', 30))
 
     # noinspection PyProtectedMember
     async def close(self):
         """Function called when closing the bot"""
         try:
-            await self.browser_page.close() or self.logger.info("Browser page successfully closed!")
+            await self.page_pool.close() or self.logger.info("Browser pages successfully closed!")
+            await self.browser.close() or self.logger.info("Browser successfully closed!")
         except (errors.PageError, AttributeError):  # browser was never created; edge case
             pass
-        await self.browser.close() or self.logger.info("Browser successfully closed!")
+        self.prefetcher.close()
+        self.privatebin.close()
+        await self.stats.close()
+        await self.metrics.close()
         await super().close()
         await self.http._session.close()
         await self.session.close()
         for logger in self.loggers:
-            for handler in logger.handlers:
+            for handler in list(logger.handlers):
                 logger.removeHandler(handler)
+        self.log_pipeline.close()
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""Bundled asset handling for the bot"""
+import io
+import json
+import os
+import random
+import re
+import time
+
+import aiohttp
+import discord
+
+SOURCE = "bot/files"
+OPTIMIZED = "bot/files/optimized"
+
+_REACTION = re.compile(r"(gun|stab|punch)_([a-z]+)\d+\.(?:gif|webp)$")
+# Normalizes the outcome part of reaction file names
+_OUTCOMES = {
+    "dodge": "dodge",
+    "suicide": "suicide",
+    "self": "suicide",
+    "shooting": "hit",
+    "stabbing": "hit",
+    "punch": "hit"
+}
+
+
+def optimized_variants(directory: str = OPTIMIZED) -> dict:
+    """
+    Read the manifest written by bot.utils.optimize.
+
+    :param directory: Directory holding the optimized assets and their manifest.
+    :return: Mapping of source file names to the paths of their optimized copies.
+    """
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {name: os.path.join(directory, entry["file"]) for name, entry in manifest.items()
+            if entry["file"] and os.path.exists(os.path.join(directory, entry["file"]))}
+
+
+class Asset:
+    """A bundled file held in memory"""
+    __slots__ = ("name", "data")
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.data = data
+
+    def file(self) -> discord.File:
+        """Creates a discord.File for sending the asset"""
+        # BytesIO shares the underlying bytes object until written to, so this doesn't copy the data
+        return discord.File(io.BytesIO(self.data), filename=self.name)
+
+
+class AssetStore:
+    """
+    In-memory index of the reaction assets, by weapon (gun, stab, punch) and outcome (dodge, suicide, hit).
+    """
+
+    def __init__(self, directory: str = SOURCE, variants: dict = None):
+        variants = variants or {}
+        self.assets = {}
+        for name in sorted(os.listdir(directory)):
+            match = _REACTION.match(name)
+            if match is None or match.group(2) not in _OUTCOMES:
+                continue
+            path = variants.get(name, os.path.join(directory, name))
+            with open(path, "rb") as f:
+                asset = Asset(os.path.basename(path), f.read())
+            self.assets.setdefault((match.group(1), _OUTCOMES[match.group(2)]), []).append(asset)
+
+    def __len__(self):
+        return sum(map(len, self.assets.values()))
+
+    @property
+    def footprint(self) -> int:
+        """Bytes of asset data held in memory"""
+        return sum(len(asset.data) for assets in self.assets.values() for asset in assets)
+
+    def choice(self, weapon: str, outcome: str) -> Asset:
+        """
+        Pick a random asset for a reaction.
+
+        :param weapon: One of gun, stab or punch.
+        :param outcome: One of dodge, suicide or hit.
+        """
+        return random.choice(self.assets[weapon, outcome])
+
+
+class AssetRegistry:
+    """
+    Remembers where bundled files were uploaded to Discord, so each one is only uploaded once.
+
+    Later sends reference the attachment URL in an embed instead. URLs are checked with a HEAD request at most once
+    every `revalidate` seconds, and files are transparently uploaded again if their URL has gone dead.
+    """
+
+    def __init__(self, bot, *, path: str = "cache/assets.json", channel_id: int = None, revalidate: float = 3600):
+        self.bot = bot
+        self.path = path
+        self.channel_id = channel_id
+        self.revalidate = revalidate
+        self._checked = {}
+        try:
+            with open(path) as f:
+                self.urls = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.urls = {}
+
+    async def send(self, destination, asset: Asset, content: str = None):
+        """
+        Send a bundled file, uploading it only if there is no live copy of it on Discord yet.
+
+        :param destination: Messageable to send to.
+        :param asset: Asset to send.
+        :param content: Message content to send along with the file.
+        :return: The sent message.
+        """
+        # Include the size so a replaced file doesn't keep pointing at the old upload
+        key = f"{asset.name}:{len(asset.data)}"
+        url = await self._live_url(key)
+        if url is None:
+            channel = self.bot.get_channel(self.channel_id) if self.channel_id else None
+            if channel is None:
+                # No storage channel, so the upload doubles as the reply
+                message = await destination.send(content, file=asset.file())
+                await self._record(key, message)
+                return message
+            await self._record(key, await channel.send(file=asset.file()))
+            url = self.urls[key]
+        embed = discord.Embed()
+        embed.set_image(url=url)
+        return await destination.send(content, embed=embed)
+
+    async def _live_url(self, key: str):
+        url = self.urls.get(key)
+        if url is None or time.monotonic() - self._checked.get(key, -self.revalidate) < self.revalidate:
+            return url
+        try:
+            async with self.bot.session.head(url) as head:
+                alive = head.status == 200
+        except aiohttp.ClientError:
+            alive = False
+        if alive:
+            self._checked[key] = time.monotonic()
+            return url
+        del self.urls[key]
+        await self._save()
+
+    async def _record(self, key: str, message: discord.Message):
+        self.urls[key] = message.attachments[0].url
+        self._checked[key] = time.monotonic()
+        await self._save()
+
+    async def _save(self):
+        def write(urls):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(urls, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+        await self.bot.loop.run_in_executor(None, write, dict(self.urls))
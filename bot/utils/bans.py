@@ -0,0 +1,149 @@
+# coding=utf-8
+"""Indexed ban lists for the bot"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+
+
+class GuildBans:
+    """
+    A guild's bans, looked up by user ID, name#discriminator or name, ignoring case for names.
+    """
+
+    def __init__(self, entries=()):
+        self.by_id = OrderedDict()
+        self.by_tag = {}
+        self.by_name = {}
+        for entry in entries:
+            self.add(entry.user, entry.reason)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, user, reason: str = None):
+        """Indexes a banned user"""
+        self.remove(user)
+        self.by_id[user.id] = (user, reason)
+        self.by_tag[str(user).lower()] = user.id
+        self.by_name.setdefault(user.name.lower(), OrderedDict())[user.id] = None
+
+    def remove(self, user):
+        """Drops an unbanned user"""
+        old = self.by_id.pop(user.id, None)
+        if old is None:
+            return
+        old_user = old[0]
+        self.by_tag.pop(str(old_user).lower(), None)
+        ids = self.by_name.get(old_user.name.lower())
+        if ids is not None:
+            ids.pop(user.id, None)
+            if not ids:
+                del self.by_name[old_user.name.lower()]
+
+    def find(self, query: str) -> list:
+        """
+        Find banned users matching an ID, name#discriminator or name.
+
+        :return: List of (user, reason) tuples, empty if nobody matches.
+        """
+        if query.isdigit() and int(query) in self.by_id:
+            return [self.by_id[int(query)]]
+        query = query.lower()
+        if query in self.by_tag:
+            return [self.by_id[self.by_tag[query]]]
+        return [self.by_id[user_id] for user_id in self.by_name.get(query, ())]
+
+    def page(self, number: int, size: int = 20) -> list:
+        """
+        Get one page of bans, in the order they were loaded or made.
+
+        :param number: Page number, starting at 1.
+        :param size: Bans per page.
+        :return: List of (user, reason) tuples.
+        """
+        start = (number - 1) * size
+        return list(itertools.islice(self.by_id.values(), start, start + size))
+
+
+class BanIndex:
+    """
+    Bans of each guild, fetched the first time they're needed and then kept current from ban and unban events.
+
+    Bans and unbans arriving while a guild's bans are being fetched are applied once the fetch completes. Bans are
+    fetched again once they are older than `ttl` seconds, to correct for events missed while disconnected.
+    """
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self.guilds = {}
+        self._expires = {}
+        self._in_flight = {}
+        self._pending = {}
+
+    async def _load(self, guild):
+        pending = self._pending[guild.id] = []
+        try:
+            bans = GuildBans(await guild.bans())
+        finally:
+            # forget detaches a load by dropping its pending list, and a newer load may have replaced it since
+            detached = self._pending.get(guild.id) is not pending
+            if not detached:
+                del self._pending[guild.id]
+        for banned, user in pending:
+            if banned:
+                bans.add(user)
+            else:
+                bans.remove(user)
+        if not detached:
+            self.guilds[guild.id] = bans
+            self._expires[guild.id] = time.monotonic() + self.ttl
+        return bans
+
+    def _done(self, guild_id: int, task):
+        if self._in_flight.get(guild_id) is task:
+            del self._in_flight[guild_id]
+
+    async def get(self, guild) -> GuildBans:
+        """
+        Get a guild's bans, fetching them if not loaded yet or loaded too long ago.
+        """
+        bans = self.guilds.get(guild.id)
+        if bans is not None and self._expires[guild.id] > time.monotonic():
+            return bans
+        task = self._in_flight.get(guild.id)
+        if task is None:
+            task = self._in_flight[guild.id] = asyncio.ensure_future(self._load(guild))
+            task.add_done_callback(lambda t: self._done(guild.id, t))
+        # Shield so one caller being cancelled doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def banned(self, guild, user):
+        """Follows a user being banned"""
+        if guild.id in self._pending:
+            self._pending[guild.id].append((True, user))
+        elif guild.id in self.guilds:
+            self.guilds[guild.id].add(user)
+
+    def unbanned(self, guild, user):
+        """Follows a user being unbanned"""
+        if guild.id in self._pending:
+            self._pending[guild.id].append((False, user))
+        elif guild.id in self.guilds:
+            self.guilds[guild.id].remove(user)
+
+    def forget(self, guild_id: int):
+        """
+        Drops a guild's bans, for when the bot leaves it or they may be stale.
+
+        A fetch already in flight still completes for the callers waiting on it, but its result isn't kept.
+        """
+        self.guilds.pop(guild_id, None)
+        self._expires.pop(guild_id, None)
+        self._pending.pop(guild_id, None)
+        self._in_flight.pop(guild_id, None)
+
+    def clear(self):
+        """Drops every guild's bans"""
+        for guild_id in list(self.guilds) + list(self._in_flight):
+            self.forget(guild_id)
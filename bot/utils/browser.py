@@ -0,0 +1,136 @@
+# coding=utf-8
+"""Headless browser page pooling for the bot"""
+import asyncio
+
+
+class PagePoolTimeout(Exception):
+    """
+    Raised when no browser page became free in time.
+    """
+    pass
+
+
+class _Slot:
+    """Place in the pool held for a page that hasn't been created yet"""
+    __slots__ = ()
+
+
+class _Lease:
+    """Async context manager handing out a page from the pool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.page = None
+
+    async def __aenter__(self):
+        self.page = await self.pool.acquire()
+        return self.page
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # A page that errored mid-navigation is in an unknown state, so don't hand it out again
+        await self.pool.release(self.page, discard=exc_type is not None)
+
+
+class PagePool:
+    """
+    Pool of pyppeteer pages shared between screenshot commands.
+
+    Pages are created lazily up to `size`, and closed after `max_uses` leases to keep Chromium's memory usage in check,
+    the next caller creating a replacement. When every page is busy, callers wait up to `timeout` seconds for one to be
+    returned.
+    """
+
+    def __init__(self, browser, *, size: int = 3, max_uses: int = 50, timeout: float = 30):
+        self.browser = browser
+        self.size = size
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self._idle = asyncio.Queue()
+        self._uses = {}
+        self._leased = 0
+        self._closed = False
+
+    @property
+    def in_use(self) -> int:
+        """Number of pages currently leased out"""
+        return self._leased
+
+    def lease(self) -> _Lease:
+        """
+        Lease a page for the duration of an `async with` block.
+        """
+        return _Lease(self)
+
+    async def acquire(self):
+        """
+        Take a page out of the pool, creating one if there is room.
+
+        :raises PagePoolTimeout: No page became free within the timeout.
+        """
+        if self._idle.empty() and len(self._uses) < self.size:
+            page = await self._new_page()
+        else:
+            try:
+                page = await asyncio.wait_for(self._idle.get(), self.timeout)
+            except asyncio.TimeoutError:
+                raise PagePoolTimeout(f"No browser page became free within {self.timeout} seconds")
+            if isinstance(page, _Slot):
+                # The place of a recycled page, fill it now
+                try:
+                    page = await self._new_page(page)
+                except BaseException:
+                    self._uses[page] = 0
+                    self._idle.put_nowait(page)
+                    raise
+        self._leased += 1
+        return page
+
+    async def release(self, page, *, discard: bool = False):
+        """
+        Return a page to the pool, recycling it if it is worn out or broken.
+        """
+        self._leased -= 1
+        self._uses[page] += 1
+        if not discard and not self._closed and self._uses[page] < self.max_uses:
+            self._idle.put_nowait(page)
+            return
+        # Hold the page's place until the replacement is created, so direct acquires can't overshoot the pool size
+        slot = _Slot()
+        self._uses[slot] = 0
+        await self._close_page(page)
+        if self._closed:
+            del self._uses[slot]
+        else:
+            # Wake anyone waiting on the queue to create the replacement, so errors creating it happen in acquire
+            self._idle.put_nowait(slot)
+
+    async def close(self):
+        """
+        Close every page in the pool.
+        """
+        self._closed = True
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            if isinstance(page, _Slot):
+                del self._uses[page]
+            else:
+                await self._close_page(page)
+
+    async def _new_page(self, slot: _Slot = None):
+        # Reserve the slot before awaiting so concurrent acquires can't overshoot the pool size
+        if slot is None:
+            slot = _Slot()
+            self._uses[slot] = 0
+        try:
+            page = await self.browser.newPage()
+        finally:
+            del self._uses[slot]
+        self._uses[page] = 0
+        return page
+
+    async def _close_page(self, page):
+        del self._uses[page]
+        try:
+            await page.close()
+        except Exception:  # the page or browser is already gone
+            pass
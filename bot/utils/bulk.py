@@ -0,0 +1,92 @@
+# coding=utf-8
+"""Bulk moderation actions for the bot"""
+import asyncio
+from collections import OrderedDict
+
+import discord
+
+
+def _reason(error: Exception) -> str:
+    """Short reason for a failed action, as given by Discord where possible"""
+    return getattr(error, 'text', None) or str(error) or type(error).__name__
+
+
+class BulkAction:
+    """
+    Runs a moderation action on many targets at once, reporting progress in one message that is edited as it goes.
+
+    At most `concurrency` actions are in flight. discord.py already holds requests to a rate limited route until its
+    bucket resets, so concurrency keeps that bucket busy rather than waiting on each round trip in turn. With a
+    `bucket`, every action first takes a token from it, for pacing below Discord's limits across commands.
+    """
+
+    def __init__(self, verb: str, action, *, concurrency: int = 4, bucket=None, interval: float = 2):
+        self.verb = verb
+        self.action = action
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.interval = interval
+        self.done = 0
+        self.failures = OrderedDict()
+
+    def _progress(self, total: int) -> str:
+        failed = sum(map(len, self.failures.values()))
+        suffix = f", {failed} failed" if failed else ""
+        return f"{self.verb.title()} {self.done}/{total} users so far{suffix}..."
+
+    def _summary(self, total: int, shown: int = 10) -> str:
+        lines = [f"Successfully {self.verb} {self.done}/{total} users"]
+        for reason, targets in self.failures.items():
+            names = ", ".join(f"`{t}`" for t in targets[:shown])
+            more = f" and {len(targets) - shown} more" if len(targets) > shown else ""
+            lines.append(f"{len(targets)} could not be {self.verb} ({reason}): {names}{more}")
+        return "\n".join(lines)
+
+    async def _run_one(self, semaphore, target, describe):
+        async with semaphore:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                await self.action(target)
+            except asyncio.CancelledError:
+                raise  # an Exception before Python 3.8, but should still stop the whole run
+            except Exception as e:  # one target failing shouldn't stop the rest
+                self.failures.setdefault(_reason(e), []).append(describe(target))
+            else:
+                self.done += 1
+
+    async def _report(self, status, total: int):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await status.edit(content=self._progress(total))
+            except discord.HTTPException:
+                pass
+
+    async def run(self, ctx, targets, *, describe=str) -> int:
+        """
+        Run the action on every target.
+
+        :param ctx: Context to report progress in.
+        :param targets: Members, users or objects to pass to the action.
+        :param describe: Turns a target into text for the failure summary.
+        :return: Number of targets the action succeeded on.
+        """
+        targets = list(targets)
+        if not targets:
+            await ctx.send(f"There's nobody to be {self.verb}!")
+            return 0
+        status = await ctx.send(self._progress(len(targets)))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reporter = ctx.bot.loop.create_task(self._report(status, len(targets)))
+        try:
+            await asyncio.gather(*(self._run_one(semaphore, target, describe) for target in targets))
+        finally:
+            reporter.cancel()
+        summary = self._summary(len(targets))
+        if len(summary) > 2000:
+            await status.delete()
+            await ctx.send(summary)
+        else:
+            await status.edit(content=summary)
+        return self.done
@@ -0,0 +1,212 @@
+# coding=utf-8
+"""Caching utilities for the bot"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def cache_key(*parts) -> str:
+    """
+    Create a content address for a set of values.
+
+    :param parts: Values identifying the cached item.
+    :return: Hex digest usable as a dictionary key or file name.
+    """
+    return hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()
+
+
+class LRUCache:
+    """
+    Least recently used cache bounded by entry count and, optionally, total size.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Get an item, marking it as recently used.
+        """
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self._data[key]
+
+    def put(self, key, value):
+        """
+        Add an item, evicting the least recently used ones if the cache is full.
+        """
+        self.pop(key)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything and still not fit
+        self._data[key] = value
+        self._sizes[key] = size
+        self.size += size
+        while len(self._data) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+            self.pop(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        """
+        Remove an item from the cache.
+        """
+        if key not in self._data:
+            return default
+        self.size -= self._sizes.pop(key)
+        return self._data.pop(key)
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+        self._data.clear()
+        self._sizes.clear()
+        self.size = 0
+
+
+class DiskCache:
+    """
+    Directory of content addressed files bounded by total size, evicting the least recently used first.
+
+    All methods do blocking file I/O, so call them from an executor. They are safe to call from several executor
+    threads at once.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def _entries(self):
+        """Cached files, skipping files still being written"""
+        return (entry for entry in os.scandir(self.path) if entry.is_file() and not entry.name.endswith(".tmp"))
+
+    def get(self, key: str):
+        """
+        Read a cached file, or None if it isn't cached.
+        """
+        try:
+            with open(self._file(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self._file(key))  # bump the mtime so eviction sees it as recently used
+        except FileNotFoundError:
+            pass  # evicted since it was read
+        return data
+
+    def put(self, key: str, data: bytes):
+        """
+        Write a file to the cache, evicting old files if the cache is over its size limit.
+        """
+        if len(data) > self.max_bytes:
+            return
+        # Each write gets its own temporary file, so concurrent puts of one key can't interleave
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with open(fd, "wb") as f:
+                f.write(data)
+            with self._lock:
+                self._pop(key)
+                os.replace(tmp, self._file(key))
+                self.size += len(data)
+                if self.size > self.max_bytes:
+                    self._evict()
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def pop(self, key: str):
+        """
+        Remove a file from the cache.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str):
+        try:
+            size = os.path.getsize(self._file(key))
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            return
+        self.size -= size
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.name))
+            except FileNotFoundError:
+                continue
+        for _, name in sorted(entries):
+            if self.size <= self.max_bytes:
+                break
+            self._pop(name)
+
+
+class TieredCache:
+    """
+    In-memory LRU cache in front of an on-disk cache.
+    """
+
+    def __init__(self, loop, path: str, *, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.loop = loop
+        self.memory = LRUCache(max_entries=max_entries)
+        self.disk = DiskCache(path, max_bytes=max_bytes)
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        """Hit and miss counts for each tier"""
+        return {"memory_hits": self.memory.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "memory_entries": len(self.memory), "disk_bytes": self.disk.size}
+
+    async def get(self, key: str):
+        """
+        Get cached bytes from the fastest tier that has them, or None.
+        """
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+        data = await self.loop.run_in_executor(None, self.disk.get, key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.put(key, data)
+        return data
+
+    async def put(self, key: str, data: bytes):
+        """
+        Store bytes in both tiers.
+        """
+        self.memory.put(key, data)
+        await self.loop.run_in_executor(None, self.disk.put, key, data)
@@ -27,24 +27,160 @@ class BotMissingRole(CheckError):
     pass
 
 
+class PermissionCache:
+    """
+    Resolved permissions of members in guild channels, kept until a role, channel overwrite or member changes.
+
+    Entries are grouped by guild so a guild's entries can be dropped together, and a guild holding more than
+    `max_entries` is cleared rather than growing further.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.guilds = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def stats(self) -> dict:
+        """Hits, misses, invalidations and number of cached entries"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'entries': sum(map(len, self.guilds.values()))
+        }
+
+    def resolve(self, channel, member):
+        """
+        Get a member's permissions in a channel, resolving them if not cached.
+        """
+        guild = getattr(channel, 'guild', None)
+        if guild is None:  # nothing to walk in private channels
+            return channel.permissions_for(member)
+        entries = self.guilds.setdefault(guild.id, {})
+        key = (channel.id, member.id)
+        try:
+            resolved = entries[key]
+        except KeyError:
+            self.misses += 1
+            if len(entries) >= self.max_entries:
+                entries.clear()
+            resolved = entries[key] = channel.permissions_for(member)
+        else:
+            self.hits += 1
+        return resolved
+
+    def invalidate_guild(self, guild_id: int):
+        """Drops every entry in a guild, for when roles or the guild owner change"""
+        if self.guilds.pop(guild_id, None):
+            self.invalidations += 1
+
+    def invalidate_channel(self, guild_id: int, channel_id: int):
+        """Drops every entry for a channel, for when its overwrites change"""
+        self._invalidate(guild_id, lambda key: key[0] == channel_id)
+
+    def invalidate_member(self, guild_id: int, member_id: int):
+        """Drops every entry for a member, for when their roles change or they leave"""
+        self._invalidate(guild_id, lambda key: key[1] == member_id)
+
+    def _invalidate(self, guild_id, predicate):
+        entries = self.guilds.get(guild_id)
+        if not entries:
+            return
+        stale = [key for key in entries if predicate(key)]
+        for key in stale:
+            del entries[key]
+        if stale:
+            self.invalidations += 1
+
+
+class RoleIndex:
+    """
+    Role IDs by lowercased name for each guild, built on first use and kept current from role events.
+    """
+
+    def __init__(self):
+        self.guilds = {}
+
+    def _names(self, guild) -> dict:
+        names = self.guilds.get(guild.id)
+        if names is None:
+            names = self.guilds[guild.id] = {}
+            for role in guild.roles:
+                names.setdefault(role.name.lower(), set()).add(role.id)
+        return names
+
+    def ids(self, guild, name: str) -> set:
+        """IDs of the roles in a guild with a name, ignoring case"""
+        return self._names(guild).get(name.lower(), set())
+
+    def add(self, role):
+        """Indexes a new role, if its guild is indexed"""
+        names = self.guilds.get(role.guild.id)
+        if names is not None:
+            names.setdefault(role.name.lower(), set()).add(role.id)
+
+    def remove(self, role):
+        """Drops a deleted role, if its guild is indexed"""
+        names = self.guilds.get(role.guild.id)
+        if names is not None:
+            ids = names.get(role.name.lower(), set())
+            ids.discard(role.id)
+            if not ids:
+                names.pop(role.name.lower(), None)
+
+    def rename(self, before, after):
+        """Follows a role's name changing"""
+        if before.name.lower() != after.name.lower():
+            self.remove(before)
+            self.add(after)
+
+    def forget(self, guild_id: int):
+        """Drops a guild's index"""
+        self.guilds.pop(guild_id, None)
+
+
+def _has_role(ctx, member, role: str) -> bool:
+    """Checks if a member has a role by name"""
+    if ctx.guild is None:
+        return False
+    # noinspection PyProtectedMember
+    return not ctx.bot.roles.ids(ctx.guild, role).isdisjoint(member._roles)
+
+
+async def is_owner(ctx):
+    """Checks if the author owns the bot, without awaiting once the owner is known"""
+    if ctx.bot.owner_id is not None:
+        return ctx.author.id == ctx.bot.owner_id
+    return await ctx.bot.is_owner(ctx.author)
+
+
+def _me(ctx):
+    """The bot as a member of the guild, or the bot user in private messages"""
+    return ctx.guild.me if ctx.guild is not None else ctx.me
+
+
 async def check_permissions(ctx, perms, *, check=all):
-    is_owner = await ctx.bot.is_owner(ctx.author)
-    if is_owner:
+    if await is_owner(ctx):
         return True
 
-    resolved = ctx.channel.permissions_for(ctx.author)
+    resolved = ctx.bot.permissions.resolve(ctx.channel, ctx.author)
     result = check(getattr(resolved, name, None) == value for name, value in perms.items())
     if result is False:
         perms = list(name.replace('_', ' ').title() for name, _ in perms.items())
         raise MissingPermission(missing=perms)
+    return True
 
 
 async def bot_check_permissions(ctx, perms, *, check=all):
-    resolved = ctx.channel.permissions_for(ctx.bot.user)
+    resolved = ctx.bot.permissions.resolve(ctx.channel, _me(ctx))
     result = check(getattr(resolved, name, None) == value for name, value in perms.items())
     if result is False:
         perms = list(name.replace('_', ' ').title() for name, _ in perms.items())
         raise BotMissingPermission(missing=perms)
+    return True
 
 
 def has_permissions(*, check=all, **perms):
@@ -55,30 +191,23 @@ def has_permissions(*, check=all, **perms):
 
 def bot_has_permissions(*, check=all, **perms):
     async def pred(ctx):
-        return await check_permissions(ctx, perms, check=check)
+        return await bot_check_permissions(ctx, perms, check=check)
     return commands.check(pred)
 
 
 async def check_role(ctx, role):
-    is_owner = await ctx.bot.is_owner(ctx.author)
-    if is_owner:
+    if await is_owner(ctx):
         return True
 
-    resolved = ctx.author.roles
-    result = role.lower() in (r.name.lower() for r in resolved)
-    if result is False:
+    if not _has_role(ctx, ctx.author, role):
         raise MissingRole(missing=role)
+    return True
 
 
 async def bot_check_role(ctx, role):
-    is_owner = await ctx.bot.is_owner(ctx.author)
-    if is_owner:
-        return True
-
-    resolved = ctx.author.roles
-    result = role.lower() in (r.name.lower() for r in resolved)
-    if result is False:
+    if not _has_role(ctx, _me(ctx), role):
         raise BotMissingRole(missing=role)
+    return True
 
 
 def has_role(role):
@@ -0,0 +1,166 @@
+# coding=utf-8
+"""Response caching for the bot's HTTP session"""
+import json
+import time
+
+from bot.utils.cache import LRUCache, cache_key
+
+
+class _CachedContent:
+    """Stand-in for an aiohttp response's content stream, reading from the stored body"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def read(self, n: int = -1) -> bytes:
+        """Returns the whole body, cached responses are never partially read"""
+        return self._body
+
+    async def iter_chunked(self, n: int):
+        """Yields the body in chunks of up to n bytes"""
+        view = memoryview(self._body)
+        for i in range(0, len(view), n):
+            yield bytes(view[i:i + n])
+
+
+class CachedResponse:
+    """
+    Stand-in for an aiohttp response whose body has already been read.
+    """
+
+    def __init__(self, status: int, headers, body: bytes, url):
+        self.status = status
+        self.headers = headers
+        self.url = url
+        self._body = body
+        self.content = _CachedContent(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    @property
+    def content_type(self) -> str:
+        """Mime type of the response"""
+        return self.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip().lower()
+
+    @property
+    def content_length(self) -> int:
+        """Size of the stored body"""
+        return len(self._body)
+
+    async def read(self) -> bytes:
+        """Returns the response body"""
+        return self._body
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        """Returns the response body decoded to a string"""
+        return self._body.decode(encoding)
+
+    async def json(self, *, encoding: str = "utf-8", loads=json.loads, **_):
+        """Returns the response body parsed as JSON"""
+        return loads(self._body.decode(encoding))
+
+    def release(self):
+        """Does nothing, the connection was already released"""
+        pass
+
+
+class _Entry:
+    __slots__ = ("response", "expires", "etag", "last_modified")
+
+    def __init__(self, response: CachedResponse, ttl: float):
+        self.response = response
+        self.expires = time.monotonic() + ttl
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+
+class _CachedRequest:
+    """Async context manager returned by CachingSession.get for cached requests"""
+
+    def __init__(self, session, url, ttl, kwargs):
+        self.session = session
+        self.url = url
+        self.ttl = ttl
+        self.kwargs = kwargs
+
+    def __await__(self):
+        return self.session.fetch(self.url, self.ttl, **self.kwargs).__await__()
+
+    async def __aenter__(self) -> CachedResponse:
+        return await self.session.fetch(self.url, self.ttl, **self.kwargs)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+class CachingSession:
+    """
+    Wraps an aiohttp.ClientSession, caching GET responses that opt in with a TTL.
+
+    Requests opt in by passing `ttl=` to `get`, or by matching one of the URL prefixes in `ttls`. Everything else,
+    including every other method and attribute, goes straight to the wrapped session. Expired entries that came with
+    an ETag or Last-Modified header are revalidated with a conditional request instead of being fetched again.
+    """
+
+    def __init__(self, session, *, ttls: dict = None, max_bytes: int = 8 * 1024 * 1024):
+        self.session = session
+        self.ttls = ttls or {}
+        self.cache = LRUCache(max_entries=4096, max_bytes=max_bytes, sizeof=lambda e: len(e.response._body))
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def __getattr__(self, item):
+        return getattr(self.session, item)
+
+    @property
+    def stats(self) -> dict:
+        """Hit, revalidation and miss counts, and the memory used by the cache"""
+        total = self.hits + self.revalidated + self.misses
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "hit_rate": (self.hits + self.revalidated) / total if total else 0.0,
+                "entries": len(self.cache), "bytes": self.cache.size}
+
+    def get(self, url, *, ttl: float = None, **kwargs):
+        """
+        Same as aiohttp.ClientSession.get, but cached for `ttl` seconds if given or configured for the URL.
+        """
+        if ttl is None:
+            ttl = next((t for prefix, t in self.ttls.items() if str(url).startswith(prefix)), None)
+        if not ttl:
+            return self.session.get(url, **kwargs)
+        return _CachedRequest(self, url, ttl, kwargs)
+
+    async def fetch(self, url, ttl: float, **kwargs) -> CachedResponse:
+        """
+        Get a response from the cache, revalidating or fetching it if it has expired.
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        params = kwargs.get("params") or {}
+        key = cache_key(url, sorted(dict(params).items()), sorted(headers.items()))
+
+        entry = self.cache.get(key)
+        if entry is not None and entry.expires > time.monotonic():
+            self.hits += 1
+            return entry.response
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with self.session.get(url, headers=headers, **kwargs) as resp:
+            if resp.status == 304 and entry is not None:
+                self.revalidated += 1
+                entry.expires = time.monotonic() + ttl
+                return entry.response
+            response = CachedResponse(resp.status, resp.headers, await resp.read(), resp.url)
+
+        self.misses += 1
+        if response.status == 200:
+            self.cache.put(key, _Entry(response, ttl))
+        return response
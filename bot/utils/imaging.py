@@ -0,0 +1,53 @@
+# coding=utf-8
+"""Image post-processing for the bot"""
+import functools
+import io
+
+from PIL import Image, ImageChops
+
+# Lookup table mapping a zero channel maximum (pure black) to 0 and everything else to 255
+_NOT_BLACK = [0] + [255] * 255
+
+
+def key_out_black(im: Image.Image) -> Image.Image:
+    """
+    Make every pure black pixel of an image fully transparent.
+
+    :param im: RGBA image to key.
+    :return: The keyed image.
+    """
+    r, g, b, a = im.split()
+    mask = ImageChops.lighter(ImageChops.lighter(r, g), b).point(_NOT_BLACK)
+    im.putalpha(ImageChops.darker(a, mask))
+    return im
+
+
+def process(data: bytes, *steps, fmt: str = "PNG") -> io.BytesIO:
+    """
+    Run image bytes through a series of processing steps.
+
+    :param data: Raw image bytes.
+    :param steps: Callables taking and returning an RGBA PIL image, applied in order.
+    :param fmt: Format to save the result as.
+    :return: Buffer containing the processed image, ready to be sent.
+    """
+    im = Image.open(io.BytesIO(data)).convert("RGBA")
+    for step in steps:
+        im = step(im)
+    buffer = io.BytesIO()
+    im.save(buffer, format=fmt)
+    buffer.seek(0)
+    return buffer
+
+
+async def run(loop, data: bytes, *steps, fmt: str = "PNG") -> io.BytesIO:
+    """
+    Run image bytes through a series of processing steps in the default executor.
+
+    :param loop: Event loop to run the processing off of.
+    :param data: Raw image bytes.
+    :param steps: Callables taking and returning an RGBA PIL image, applied in order.
+    :param fmt: Format to save the result as.
+    :return: Buffer containing the processed image, ready to be sent.
+    """
+    return await loop.run_in_executor(None, functools.partial(process, data, *steps, fmt=fmt))
@@ -1,15 +1,92 @@
 # coding=utf-8
 """Formats logging for bot"""
+import json
 import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
 
 import colorlog
 
+# Attributes every LogRecord has, anything else was passed through `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
 
-def setup_logger(logger_name: str):
+
+class JSONFormatter(logging.Formatter):
     """
-    Setting up logging.
+    Formats records as one JSON object per line, including any fields passed through `extra`.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        # colorlog sets log_color attributes on the records it formats, which the console handler may have done first
+        entry.update({k: v for k, v in vars(record).items() if k not in _RESERVED and not k.endswith("log_color")})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queues records untouched, so messages are formatted by the listener's thread instead of the logging one.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through a random fraction of records below WARNING.
     """
-    formatter = colorlog.LevelFormatter(
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class LogPipeline:
+    """
+    Handlers shared by every logger of the bot.
+
+    Records go to the console, and with `json_path`, to a JSON lines file as well. With `queued`, loggers only put
+    records on a queue, and a background thread formats and writes them.
+    """
+
+    def __init__(self, *, queued: bool = False, json_path: str = None):
+        self.outputs = [logging.StreamHandler()]
+        self.outputs[0].setFormatter(_console_formatter())
+        if json_path:
+            self.outputs.append(logging.FileHandler(json_path, encoding="utf-8"))
+            self.outputs[1].setFormatter(JSONFormatter())
+        self.listener = None
+        self.handlers = self.outputs
+        if queued:
+            records = queue.Queue()
+            self.listener = QueueListener(records, *self.outputs, respect_handler_level=True)
+            self.listener.start()
+            self.handlers = [DeferredQueueHandler(records)]
+
+    def close(self):
+        """Writes out queued records and closes every handler"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        for handler in self.outputs:
+            handler.close()
+
+
+def _console_formatter():
+    """Colored formatter for console output"""
+    return colorlog.LevelFormatter(
         fmt={
             "DEBUG": "{log_color}[{asctime}] [{name}] [{levelname}] {message}",
             "INFO": "{log_color}[{asctime}] [{name}] [{levelname}] {message}",
@@ -27,14 +104,34 @@ def setup_logger(logger_name: str):
         style="{",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
+
+
+def setup_logger(logger_name: str, pipeline: LogPipeline = None, *, sample: float = None):
+    """
+    Setting up logging.
+
+    Handlers and filters from an earlier setup of the same logger are replaced rather than added to.
+
+    :param logger_name: Name of the logger.
+    :param pipeline: Handlers to log to, or a new console handler if not given.
+    :param sample: Fraction of records below WARNING to keep, or None to keep them all.
+    """
     logger = logging.getLogger(logger_name)
     logger.level = logging.INFO
 
     # Set the root logger level, too.
     logging.root.setLevel(logger.level)
 
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for _filter in list(logger.filters):
+        if isinstance(_filter, SampleFilter):
+            logger.removeFilter(_filter)
+
+    handlers = pipeline.handlers if pipeline is not None else LogPipeline().handlers
+    for handler in handlers:
+        logger.addHandler(handler)
+    if sample is not None and sample < 1:
+        logger.addFilter(SampleFilter(sample))
 
     return logger
@@ -0,0 +1,190 @@
+# coding=utf-8
+"""Command latency metrics for the bot"""
+import asyncio
+import bisect
+import time
+from collections import Counter
+
+from aiohttp import web
+from discord.ext.commands import Command
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+STAGES = ("converters", "checks", "callback", "total")
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, in seconds.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """Add a measurement"""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile, interpolating within the bucket it falls in.
+
+        :param q: Quantile between 0 and 1.
+        :return: Estimated latency, or 0 with no measurements.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+
+class CommandMetrics:
+    """
+    Latency histograms for each stage of every command, with error and timeout counts, labelled by shard.
+
+    Converter and check time are measured by the Command patches below and added up on the invocation context, so
+    groups count the time of every command in the chain. Callback time is whatever is left of the total.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = Counter()
+        self.timeouts = Counter()
+        self._runner = None
+
+    @staticmethod
+    def _labels(ctx):
+        """Command and shard labels of a context"""
+        return ctx.command.qualified_name, ctx.guild.shard_id if ctx.guild else 0
+
+    def observe(self, command: str, shard: int, stage: str, seconds: float):
+        """Add a measurement of one stage of a command"""
+        key = (command, shard, stage)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    def invoked(self, ctx, total: float):
+        """Records the stages of a finished invocation"""
+        if ctx.command is None:
+            return
+        command, shard = self._labels(ctx)
+        timings = getattr(ctx, "timings", {})
+        for stage in ("converters", "checks"):
+            self.observe(command, shard, stage, timings.get(stage, 0.0))
+        self.observe(command, shard, "callback", max(total - sum(timings.values()), 0.0))
+        self.observe(command, shard, "total", total)
+
+    def failed(self, ctx, error: Exception):
+        """Counts an error raised by a command"""
+        if ctx.command is None:
+            return
+        labels = self._labels(ctx)
+        self.errors[labels] += 1
+        if isinstance(getattr(error, "original", error), asyncio.TimeoutError):
+            self.timeouts[labels] += 1
+
+    def summary(self, stage: str = "total", limit: int = 10) -> list:
+        """
+        Slowest commands by 95th percentile latency of a stage, across shards.
+
+        :return: List of (command, uses, p50, p95, p99, max, errors, timeouts) rows.
+        """
+        merged = {}
+        for (command, _, _stage), histogram in self.histograms.items():
+            if _stage != stage:
+                continue
+            total = merged.setdefault(command, Histogram())
+            total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+            total.count += histogram.count
+            total.sum += histogram.sum
+            total.max = max(total.max, histogram.max)
+        errors, timeouts = Counter(), Counter()
+        for (command, _), count in self.errors.items():
+            errors[command] += count
+        for (command, _), count in self.timeouts.items():
+            timeouts[command] += count
+        rows = [(command, h.count, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99), h.max, errors[command],
+                 timeouts[command]) for command, h in merged.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:limit]
+
+    def prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = ["# TYPE bot_command_seconds histogram"]
+        for (command, shard, stage), histogram in sorted(self.histograms.items()):
+            labels = f'command="{command}",shard="{shard}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'bot_command_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"bot_command_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"bot_command_seconds_count{{{labels}}} {histogram.count}")
+        for name, counter in (("bot_command_errors_total", self.errors),
+                              ("bot_command_timeouts_total", self.timeouts)):
+            lines.append(f"# TYPE {name} counter")
+            for (command, shard), count in sorted(counter.items()):
+                lines.append(f'{name}{{command="{command}",shard="{shard}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, request):
+        """Serves the metrics page"""
+        return web.Response(text=self.prometheus(), content_type="text/plain")
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9100):
+        """Starts serving metrics over HTTP at /metrics"""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        """Stops serving metrics, if serving"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _add_timing(ctx, stage: str, seconds: float):
+    """Adds to the time a stage has taken in an invocation"""
+    timings = getattr(ctx, "timings", None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+old_can_run = Command.can_run
+old_parse_arguments = Command._parse_arguments
+
+
+async def can_run(self, ctx):
+    """Overrides default can_run in order to time checks run while invoking the command, but not in help"""
+    if ctx.command is not self:
+        return await old_can_run(self, ctx)
+    start = time.perf_counter()
+    try:
+        return await old_can_run(self, ctx)
+    finally:
+        _add_timing(ctx, "checks", time.perf_counter() - start)
+
+
+async def parse_arguments(self, ctx):
+    """Overrides default _parse_arguments in order to time converters"""
+    start = time.perf_counter()
+    try:
+        return await old_parse_arguments(self, ctx)
+    finally:
+        _add_timing(ctx, "converters", time.perf_counter() - start)
@@ -0,0 +1,120 @@
+# coding=utf-8
+"""
+Offline optimization of the bundled reaction assets
+
+Run from the repository root with `python -m bot.utils.optimize`. Optimized copies of the animated files in
+bot/files are written to bot/files/optimized along with a manifest.json, which the Images cog uses to pick the
+smaller variant when sending.
+"""
+import argparse
+import json
+import os
+
+from PIL import Image, ImageSequence, features
+
+SOURCE = "bot/files"
+OUTPUT = "bot/files/optimized"
+EXTENSIONS = (".gif", ".webp")
+
+
+def _frames(im: Image.Image, max_fps: float, max_size: int, colors: int):
+    """
+    Decode, downsample and re-palette the frames of an animation.
+
+    :return: List of (frame, duration in milliseconds) tuples.
+    """
+    frames = []
+    min_duration = 1000 / max_fps
+    for frame in ImageSequence.Iterator(im):
+        duration = frame.info.get("duration", 100) or 100
+        # Fold frames shown for less than the minimum duration into the previous one to cut the frame rate
+        if frames and frames[-1][1] < min_duration:
+            frames[-1] = (frames[-1][0], frames[-1][1] + duration)
+            continue
+        frame = frame.convert("RGB")
+        frame.thumbnail((max_size, max_size), Image.LANCZOS)
+        frame = frame.quantize(colors=colors)
+        frame.info = {}  # don't carry the source frame's transparency index over to the new palette
+        frames.append((frame, duration))
+    return frames
+
+
+def optimize(path: str, output: str, *, max_fps: float = 15, max_size: int = 320, colors: int = 128,
+             webp: bool = False) -> dict:
+    """
+    Write an optimized copy of an animated asset.
+
+    :param path: Path of the source asset.
+    :param output: Directory to write the optimized asset to.
+    :param max_fps: Frame rate to reduce the animation to.
+    :param max_size: Maximum width and height of the output.
+    :param colors: Palette size of each frame.
+    :param webp: Whether to also try an animated WebP and keep it if it is smaller.
+    :return: Manifest entry for the asset.
+    """
+    name, ext = os.path.splitext(os.path.basename(path))
+    with Image.open(path) as im:
+        frames = _frames(im, max_fps, max_size, colors)
+        loop = im.info.get("loop", 0)
+    images, durations = [f for f, _ in frames], [d for _, d in frames]
+    options = dict(save_all=True, append_images=images[1:], duration=durations, loop=loop)
+
+    candidates = []
+    gif = os.path.join(output, f"{name}.gif")
+    images[0].save(gif, optimize=True, **options)
+    candidates.append(gif)
+    if webp and features.check("webp_anim"):
+        animated = os.path.join(output, f"{name}.webp")
+        rgb = [i.convert("RGB") for i in images]
+        rgb[0].save(animated, quality=80, method=4, **dict(options, append_images=rgb[1:]))
+        candidates.append(animated)
+
+    source_bytes = os.path.getsize(path)
+    best = min(candidates, key=os.path.getsize)
+    if os.path.getsize(best) >= source_bytes:
+        best = None  # optimizing made it bigger, keep sending the original
+    for candidate in candidates:
+        if candidate != best:
+            os.remove(candidate)
+
+    return {
+        "file": os.path.basename(best) if best else None,
+        "source_bytes": source_bytes,
+        "bytes": os.path.getsize(best) if best else source_bytes,
+        "frames": len(images),
+        "size": list(images[0].size)
+    }
+
+
+def main(argv=None):
+    """Optimizes every animated asset and writes the manifest and a report"""
+    parser = argparse.ArgumentParser(description="Optimize the bundled reaction assets.")
+    parser.add_argument("--source", default=SOURCE)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--max-fps", type=float, default=15)
+    parser.add_argument("--max-size", type=int, default=320)
+    parser.add_argument("--colors", type=int, default=128)
+    parser.add_argument("--webp", action="store_true", help="also try animated WebP output")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(args.source)):
+        if not name.endswith(EXTENSIONS):
+            continue
+        entry = optimize(os.path.join(args.source, name), args.output, max_fps=args.max_fps,
+                         max_size=args.max_size, colors=args.colors, webp=args.webp)
+        manifest[name] = entry
+        print(f"{name:<24} {entry['source_bytes']:>10,} -> {entry['bytes']:>10,} bytes "
+              f"({entry['file'] or 'original kept'})")
+
+    with open(os.path.join(args.output, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    before = sum(e["source_bytes"] for e in manifest.values())
+    after = sum(e["bytes"] for e in manifest.values())
+    print(f"Total: {before:,} -> {after:,} bytes, saved {before - after:,} ({(before - after) / (before or 1):.0%})")
+
+
+if __name__ == "__main__":
+    main()
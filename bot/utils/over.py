@@ -7,8 +7,7 @@ import itertools
 import re
 
 import discord
-from discord.ext.commands import HelpFormatter as HelpF, Paginator, Command
-from bot.utils import polr, privatebin
+from discord.ext.commands import HelpFormatter as HelpF, Paginator, Command, CommandError
 
 from bot.utils.args import ArgParseConverter as ArgPC
 
@@ -32,24 +31,91 @@ def create_help(cmd, parser):
     return cmd.usage
 
 
+class _Lines(list):
+    """Records lines given to it in place of a Paginator, so they can be replayed into one later"""
+
+    def add_line(self, line='', *, empty=False):
+        """Records a line"""
+        self.append((line, empty))
+
+    def replay(self, paginator):
+        """Adds every recorded line to a paginator"""
+        for line, empty in self:
+            paginator.add_line(line, empty=empty)
+
+
+class _HelpPage:
+    """The parts of a help page that don't depend on who is asking for it"""
+    __slots__ = ('header', 'pages', 'rows')
+
+    def __init__(self, header, pages=None, rows=()):
+        self.header = header
+        self.pages = pages
+        self.rows = rows
+
+
 class HelpFormatter(HelpF):
-    """Custom override for the default help command"""
+    """
+    Custom override for the default help command
+
+    Descriptions, signatures and command listings are built once per command, cog or the bot and cached until
+    invalidate() is called, which happens whenever extensions are loaded or unloaded. Only checks and the ending note,
+    which names the alias help was invoked with, are done per request.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._paginator = None
+        self._cache = {}
+        self._checks = {}
+
+    def invalidate(self):
+        """Clears cached help pages, for when commands have been added or removed"""
+        self._cache.clear()
+
+    async def format_help_for(self, context, command_or_bot):
+        """Formats the help page, forgetting check results from any earlier help request"""
+        self._checks = {}
+        return await super().format_help_for(context, command_or_bot)
+
+    async def _can_run(self, ctx, command):
+        """Runs a command's checks, at most once for each command in a help request"""
+        key = (id(ctx), command)
+        if key not in self._checks:
+            try:
+                self._checks[key] = await command.can_run(ctx)
+            except CommandError:
+                self._checks[key] = False
+        return self._checks[key]
+
+    async def filter_command_list(self):
+        """Returns the commands that can be listed, skipping aliases and memoizing check results"""
+        ctx = self.context
+        is_cog = self.is_cog()
+        iterator = self.command.all_commands.items() if not is_cog else ctx.bot.all_commands.items()
+        filtered = []
+        for name, command in iterator:
+            if name in command.aliases:
+                continue
+            if is_cog and command.instance is not self.command:
+                continue
+            if command.hidden and not self.show_hidden:
+                continue
+            if self.show_check_failure or await self._can_run(ctx, command):
+                filtered.append((name, command))
+        return filtered
+
+    def _cache_key(self):
+        """Key of the cached page for the current command, with the prefix since it's part of the page"""
+        if self.is_bot():
+            return None, self.clean_prefix
+        if self.is_cog():
+            return type(self.command).__name__, self.clean_prefix
+        return self.command, self.clean_prefix
 
-    async def format(self):
-        """Handles the actual behaviour involved with formatting.
-
-        To change the behaviour, this method should be overridden.
-
-        Returns
-        --------
-        list
-            A paginated output of the help command.
-        """
-        self._paginator = Paginator()
+    def _build(self):
+        """Builds everything in the help page that doesn't depend on checks"""
+        header = _Lines()
 
         # we need a padding of ~80 or so
 
@@ -57,23 +123,25 @@ class HelpFormatter(HelpF):
 
         if description:
             # <description> portion
-            self._paginator.add_line(description, empty=True)
+            header.add_line(description, empty=True)
 
         if isinstance(self.command, Command):
             # <signature portion>
             if self.command.params.get("args", None) and type(self.command.params['args'].annotation) == ArgPC:
                 self.command.usage = create_help(self.command, self.command.params['args'].annotation.parser)
             signature = self.get_command_signature()
-            self._paginator.add_line(signature, empty=True)
+            header.add_line(signature, empty=True)
 
             # <long doc> section
             if self.command.help:
-                self._paginator.add_line(self.command.help, empty=True)
+                header.add_line(self.command.help, empty=True)
 
             # end it here if it's just a regular command
             if not self.has_subcommands():
+                self._paginator = Paginator()
+                header.replay(self._paginator)
                 self._paginator.close_page()
-                return self._paginator.pages
+                return _HelpPage(header, pages=self._paginator.pages)
 
         max_width = self.max_name_size
 
@@ -84,26 +152,49 @@ class HelpFormatter(HelpF):
             # last place sorting position.
             return cog + ':' if cog is not None else '\u200bNo Category:'
 
-        filtered = await self.filter_command_list()
-        if self.is_bot():
-            data = sorted(filtered, key=category)
-            for category, commands in itertools.groupby(data, key=category):
-                # there simply is no prettier way of doing this.
-                commands = sorted(commands)
-                if len(commands) > 0:
-                    self._paginator.add_line(category)
-
-                self._add_subcommands_to_page(max_width, commands)
-        else:
-            filtered = sorted(filtered)
-            if filtered:
-                self._paginator.add_line('Commands:')
-                self._add_subcommands_to_page(max_width, filtered)
+        commands = self.command.all_commands if not self.is_cog() else self.context.bot.all_commands
+        listed = [(name, command) for name, command in commands.items() if name not in command.aliases and
+                  (not self.is_cog() or command.instance is self.command)]
+        key = (lambda tup: (category(tup), tup[0])) if self.is_bot() else (lambda tup: tup[0])
+        rows = []
+        for name, command in sorted(listed, key=key):
+            self._paginator = _Lines()
+            self._add_subcommands_to_page(max_width, [(name, command)])
+            rows.append((category((name, command)) if self.is_bot() else 'Commands:', name, self._paginator))
+
+        return _HelpPage(header, rows=rows)
+
+    async def format(self):
+        """Handles the actual behaviour involved with formatting.
+
+        To change the behaviour, this method should be overridden.
+
+        Returns
+        --------
+        list
+            A paginated output of the help command.
+        """
+        key = self._cache_key()
+        page = self._cache.get(key)
+        if page is None:
+            page = self._cache[key] = self._build()
+        if page.pages is not None:
+            return page.pages
+
+        self._paginator = Paginator()
+        page.header.replay(self._paginator)
+
+        allowed = {name for name, _ in await self.filter_command_list()}
+        for category, rows in itertools.groupby(page.rows, key=lambda row: row[0]):
+            rows = [lines for _, name, lines in rows if name in allowed]
+            if rows:
+                self._paginator.add_line(category)
+            for lines in rows:
+                lines.replay(self._paginator)
 
         # add the ending note
         self._paginator.add_line()
-        ending_note = self.get_ending_note()
-        self._paginator.add_line(ending_note)
+        self._paginator.add_line(self.get_ending_note())
         return self._paginator.pages
 
 
@@ -181,17 +272,10 @@ old_send = discord.abc.Messageable.send
 
 
 async def send(self, content=None, **kwargs):
-    """Overrides default send method in order to create a paste if the response is more than 2000 characters"""
+    """Overrides default send method in order to split, attach or paste responses over 2000 characters"""
     if content is not None and any(x in str(content) for x in ["@everyone", "@here"]):
         content = content.replace("@everyone", "@\u0435veryone").replace("@here", "@h\u0435re")
     if content is not None and len(str(content)) > 2000:
-        if content.startswith("```py"):
-            content = "\n".join(content.split("\n")[1:-1])
-        paste = await privatebin.upload(content, expires="15min", server=self.bot.priv)
-        if self.bot.polr:
-            paste = await polr.shorten(paste, **self.bot.polr)
-        return await old_send(self, f"Hey, I couldn't handle all the text I was gonna send you, so I put it in a paste!"
-                                    f"\nThe link is **{paste}**, but it expires in 15 minutes, so get it quick!",
-                              **kwargs)
+        return await self.bot.overflow.send(old_send, self, str(content), **kwargs)
     else:
         return await old_send(self, content, **kwargs)
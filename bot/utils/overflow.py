@@ -0,0 +1,149 @@
+# coding=utf-8
+"""Delivery of messages over Discord's character limit"""
+import io
+import re
+import time
+
+import discord
+
+LIMIT = 2000
+_FENCE = re.compile(r"```[\w+#.-]*\s*")
+
+
+def _is_fence(line: str) -> bool:
+    """Whether a line opens or closes a code block, being nothing but ``` and an optional language"""
+    return _FENCE.fullmatch(line) is not None
+
+
+def split_message(content: str, limit: int = LIMIT) -> list:
+    """
+    Split content into chunks of at most `limit` characters on line boundaries.
+
+    Code blocks cut in two are closed at the end of one chunk and reopened with the same language at the start of
+    the next, so each chunk renders on its own.
+
+    :param content: Text to split.
+    :param limit: Maximum length of a chunk.
+    :return: List of chunks, or an empty list if a code block's fences can't be kept within the limit.
+    """
+    chunks = []
+    current = ""
+    filled = False  # whether current holds anything besides fences and blank lines
+    fence = None  # opening line of the code block the current line is in, if any
+    for line in content.split("\n"):
+        toggles = _is_fence(line)
+        # Lines that can't fit in any chunk get hard wrapped, leaving room for a reopened fence and a closing one
+        width = limit - len("\n```") - (len(fence) + 1 if fence else 0)
+        if width < len("```") or toggles and len(line) > width:
+            return []
+        pieces = [line[i:i + width] for i in range(0, len(line), width)] or [""]
+        for piece in pieces:
+            after = (None if fence else line) if toggles else fence
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) + (len("\n```") if after else 0) > limit:
+                # A chunk of nothing but fences is dropped rather than sent
+                if filled:
+                    chunks.append(current + ("\n```" if fence else ""))
+                filled = False
+                if toggles and fence:
+                    current = ""  # the fence this line closes was just closed
+                else:
+                    current = f"{fence}\n{piece}" if fence else piece
+            else:
+                current = candidate
+            filled = filled or not toggles and bool(piece.strip())
+        if toggles:
+            fence = None if fence else line
+    if filled:
+        chunks.append(current)
+    return chunks
+
+
+def _strip_fence(content: str):
+    """Removes a wrapping code block, returning the content and a file extension matching its language"""
+    if content.startswith("```") and content.rstrip().endswith("```"):
+        language = content.split("\n", 1)[0][3:].strip()
+        return "\n".join(content.split("\n")[1:-1]), language or "txt"
+    return content, "txt"
+
+
+class Overflow:
+    """
+    Picks how to deliver content that is over the character limit, and tracks how long each way takes.
+
+    Content that fits in `max_messages` messages is split, content up to `max_file` characters is attached as a text
+    file, and anything bigger goes to a paste. Setting either threshold to 0 turns that strategy off.
+    """
+
+    def __init__(self, bot, *, max_messages: int = 3, max_file: int = 4 * 1024 * 1024):
+        self.bot = bot
+        self.max_messages = max_messages
+        self.max_file = max_file
+        self.strategies = {
+            "split": self.split,
+            "file": self.attach,
+            "paste": self.paste
+        }
+        self.metrics = {name: {"count": 0, "total": 0.0, "max": 0.0} for name in self.strategies}
+
+    @property
+    def stats(self) -> dict:
+        """Uses and average and max latency of each strategy"""
+        return {name: {"count": m["count"], "average_latency": m["total"] / m["count"] if m["count"] else 0.0,
+                       "max_latency": m["max"]} for name, m in self.metrics.items()}
+
+    def choose(self, content: str, chunks: list) -> str:
+        """
+        Name the strategy to use for content.
+        """
+        if chunks and len(chunks) <= self.max_messages:
+            return "split"
+        if len(content) <= self.max_file:
+            return "file"
+        return "paste"
+
+    async def send(self, send, destination, content: str, **kwargs):
+        """
+        Deliver oversized content.
+
+        :param send: Original send function.
+        :param destination: Messageable to send to.
+        :param content: Text over the character limit.
+        :return: The last message sent.
+        """
+        chunks = split_message(content)
+        name = self.choose(content, chunks)
+        start = time.monotonic()
+        try:
+            return await self.strategies[name](send, destination, content, chunks, **kwargs)
+        finally:
+            elapsed = time.monotonic() - start
+            metric = self.metrics[name]
+            metric["count"] += 1
+            metric["total"] += elapsed
+            metric["max"] = max(metric["max"], elapsed)
+
+    @staticmethod
+    async def split(send, destination, content, chunks, **kwargs):
+        """Sends content as several messages, with any embeds or files on the last one"""
+        for chunk in chunks[:-1]:
+            await send(destination, chunk)
+        return await send(destination, chunks[-1], **kwargs)
+
+    @staticmethod
+    async def attach(send, destination, content, chunks, **kwargs):
+        """Sends content as a text file"""
+        text, extension = _strip_fence(content)
+        file = discord.File(io.BytesIO(text.encode()), filename=f"output.{extension}")
+        return await send(destination, "Hey, that was too much text for one message, so here it is as a file!",
+                          file=file, **{k: v for k, v in kwargs.items() if k not in ("file", "files")})
+
+    async def paste(self, send, destination, content, chunks, **kwargs):
+        """Uploads content to PrivateBin and sends the link, shortened if Polr is set up"""
+        text, _ = _strip_fence(content)
+        paste = await self.bot.privatebin.upload(text, expires="15min")
+        if self.bot.polr:
+            paste = await self.bot.polr.shorten(paste)
+        return await send(destination, f"Hey, I couldn't handle all the text I was gonna send you, so I put it in a "
+                                       f"paste!\nThe link is **{paste}**, but it expires in 15 minutes, so get it "
+                                       f"quick!", **kwargs)
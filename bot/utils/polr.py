@@ -6,8 +6,12 @@ Uses modified code from
 <https://github.com/fauskanger/mypolr/blob/fc11df734e35a1c1d5382341c09c043433c8a851/mypolr/polr_api.py>,
 © 2017 Thomas Fauskanger
 """
+import asyncio
+
 import aiohttp
 
+from bot.utils.cache import LRUCache
+
 
 def _get_ending(lookup_url: str, api_base: str):
     """
@@ -18,56 +22,97 @@ def _get_ending(lookup_url: str, api_base: str):
     return lookup_url
 
 
-async def shorten(long_url: str, api_base: str, api_key: str):
+class Polr:
     """
-    Creates a short url if valid.
+    Client for a Polr instance.
+
+    Shortened and looked up urls are cached in both directions, and concurrent requests for the same url share a
+    single request.
     """
-    params = {
-        'url': long_url,
-        'key': api_key,
-        'response_type': 'json'
-    }
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(api_base + '/api/v2/action/shorten', params=params) as r:
+
+    def __init__(self, api_base: str, api_key: str, *, session: aiohttp.ClientSession, cache_size: int = 1024):
+        self.api_base = api_base
+        self.api_key = api_key
+        self.session = session
+        self.short_urls = LRUCache(max_entries=cache_size)
+        self.long_urls = LRUCache(max_entries=cache_size)
+        self._in_flight = {}
+
+    def _coalesce(self, key: tuple, func, *args):
+        """Runs func(*args), or joins the already running call for the same key"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one caller being cancelled doesn't cancel the request for everyone else
+        return asyncio.shield(task)
+
+    def _remember(self, long_url: str, short_url: str):
+        self.short_urls.put(long_url, short_url)
+        self.long_urls.put(_get_ending(short_url, self.api_base), long_url)
+
+    async def shorten(self, long_url: str):
+        """
+        Creates a short url if valid.
+        """
+        short_url = self.short_urls.get(long_url)
+        if short_url is not None:
+            return short_url
+        return await self._coalesce(('shorten', long_url), self._shorten, long_url)
+
+    async def _shorten(self, long_url: str):
+        params = {
+            'url': long_url,
+            'key': self.api_key,
+            'response_type': 'json'
+        }
+        async with self.session.get(self.api_base + '/api/v2/action/shorten', params=params) as r:
             data = await r.json()
             action = data.get('action')
             short_url = data.get('result')
             if action == 'shorten' and short_url is not None:
+                self._remember(long_url, short_url)
                 return short_url
 
+    async def lookup(self, lookup_url: str):
+        """
+        Looks up the url_ending to obtain information about the short url.
+        If it exists, the API will return a dictionary with information, including
+        the long_url that is the destination of the given short url URL.
+        """
+        url_ending = _get_ending(lookup_url, self.api_base)
+        full_url = self.long_urls.get(url_ending)
+        if full_url is not None:
+            return full_url
+        return await self._coalesce(('lookup', url_ending), self._lookup, url_ending)
 
-async def lookup(lookup_url: str, api_base: str, api_key: str):
-    """
-    Looks up the url_ending to obtain information about the short url.
-    If it exists, the API will return a dictionary with information, including
-    the long_url that is the destination of the given short url URL.
-    """
-    url_ending = _get_ending(lookup_url, api_base)
-    params = {
-        'url_ending': url_ending,
-        'key': api_key,
-        'response_type': 'json'
-    }
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(api_base + '/api/v2/action/lookup', params=params) as r:
+    async def _lookup(self, url_ending: str):
+        params = {
+            'url_ending': url_ending,
+            'key': self.api_key,
+            'response_type': 'json'
+        }
+        async with self.session.get(self.api_base + '/api/v2/action/lookup', params=params) as r:
             data = await r.json()
             action = data.get('action')
             full_url = data.get('result')
             if action == 'lookup' and full_url is not None:
+                self.long_urls.put(url_ending, full_url)
                 return full_url
 
-
-async def delete(short_url: str, api_base: str, api_key: str):
-    """
-    Deletes a short url.
-    """
-    params = {
-        'key': api_key,
-        'response_type': 'json'
-    }
-    url_ending = _get_ending(short_url, api_base)
-    async with aiohttp.ClientSession() as sess:
-        async with sess.get(api_base + f'/api/v2/links/{url_ending}', params=params) as r:
+    async def delete(self, short_url: str):
+        """
+        Deletes a short url.
+        """
+        params = {
+            'key': self.api_key,
+            'response_type': 'json'
+        }
+        url_ending = _get_ending(short_url, self.api_base)
+        async with self.session.get(self.api_base + f'/api/v2/links/{url_ending}', params=params) as r:
             data = await r.json()
             if data['message'] == 'OK':
+                long_url = self.long_urls.pop(url_ending)
+                if long_url is not None:
+                    self.short_urls.pop(long_url)
                 return True
@@ -0,0 +1,141 @@
+# coding=utf-8
+"""Incrementally maintained user counts and guild memberships for the bot"""
+import asyncio
+from array import array
+
+import discord
+
+
+def _is_online(member) -> bool:
+    """Whether a member shows as anything but offline"""
+    return member.status != discord.Status.offline
+
+
+def _add_guild(memberships: dict, user_id: int, guild_id: int):
+    """Adds a guild to a user's memberships, if not already there"""
+    current = memberships.get(user_id)
+    if current is None:
+        memberships[user_id] = guild_id
+    elif type(current) is int:
+        if current != guild_id:
+            memberships[user_id] = array('Q', (current, guild_id))
+    elif guild_id not in current:
+        current.append(guild_id)
+
+
+class PopulationIndex:
+    """
+    Unique and online user counts across every guild, and the guilds each user shares with the bot, kept up to date
+    from member and guild events.
+
+    Most users share a single guild with the bot, so memberships map a user ID straight to that guild's ID, and only
+    users in several guilds get an array of guild IDs. Status is the same for a user in every guild, so online users
+    are tracked by ID.
+    """
+
+    def __init__(self):
+        self.memberships = {}
+        self.online = set()
+
+    @property
+    def users(self) -> int:
+        """Number of unique users"""
+        return len(self.memberships)
+
+    @property
+    def users_online(self) -> int:
+        """Number of unique users not offline"""
+        return len(self.online)
+
+    def shared(self, user_id: int) -> int:
+        """Number of guilds a user shares with the bot"""
+        current = self.memberships.get(user_id)
+        if current is None:
+            return 0
+        return 1 if type(current) is int else len(current)
+
+    def guilds_of(self, user_id: int) -> tuple:
+        """IDs of the guilds a user shares with the bot"""
+        current = self.memberships.get(user_id)
+        if current is None:
+            return ()
+        return (current,) if type(current) is int else tuple(current)
+
+    def add(self, member):
+        """Counts a member of a guild"""
+        _add_guild(self.memberships, member.id, member.guild.id)
+        if _is_online(member):
+            self.online.add(member.id)
+
+    def remove(self, member):
+        """Stops counting a member of a guild"""
+        current = self.memberships.get(member.id)
+        if current is None:
+            return
+        if type(current) is int:
+            if current == member.guild.id:
+                del self.memberships[member.id]
+                self.online.discard(member.id)
+            return
+        try:
+            current.remove(member.guild.id)
+        except ValueError:
+            return
+        if len(current) == 1:
+            self.memberships[member.id] = current[0]
+
+    def update(self, before, after):
+        """Follows a member's status changing"""
+        if after.id not in self.memberships:
+            return
+        if _is_online(after):
+            self.online.add(after.id)
+        else:
+            self.online.discard(after.id)
+
+    def add_guild(self, guild):
+        """Counts every member of a guild"""
+        for member in guild.members:
+            self.add(member)
+
+    def remove_guild(self, guild):
+        """Stops counting every member of a guild"""
+        for member in guild.members:
+            self.remove(member)
+
+    async def reconcile(self, guilds, chunk: int = 10000) -> int:
+        """
+        Rebuild the index from scratch, correcting any drift from missed events.
+
+        The scan yields to the event loop every `chunk` members. Events arriving during the scan aren't reflected in
+        guilds already scanned, so the result is exact to within those.
+
+        :param guilds: Every guild the bot is in.
+        :param chunk: Members to count between yields.
+        :return: Difference in unique users from before the rebuild.
+        """
+        memberships = {}
+        online = set()
+        counted = 0
+        offline = discord.Status.offline
+        for guild in list(guilds):
+            members = guild.members
+            guild_id = guild.id
+            # _add_guild inlined, this loop runs once per membership
+            for member in members:
+                user_id = member.id
+                current = memberships.get(user_id)
+                if current is None:
+                    memberships[user_id] = guild_id
+                elif type(current) is int:
+                    memberships[user_id] = array('Q', (current, guild_id))
+                else:
+                    current.append(guild_id)
+            online.update(member.id for member in members if member.status != offline)
+            counted += len(members)
+            if counted >= chunk:
+                counted = 0
+                await asyncio.sleep(0)
+        drift = len(memberships) - len(self.memberships)
+        self.memberships, self.online = memberships, online
+        return drift
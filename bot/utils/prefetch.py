@@ -0,0 +1,158 @@
+# coding=utf-8
+"""Background prefetching for random-content commands"""
+import asyncio
+import io
+import logging
+from collections import deque
+
+log = logging.getLogger("Bot")
+
+
+def _sizeof(item) -> int:
+    """Approximates the memory held by a prefetched result"""
+    if isinstance(item, tuple):
+        return sum(map(_sizeof, item))
+    if isinstance(item, io.BytesIO):
+        return item.getbuffer().nbytes
+    if isinstance(item, (str, bytes)):
+        return len(item)
+    return 0
+
+
+class _Source:
+    """A registered source and its buffer"""
+
+    def __init__(self, fetch, size: int, concurrency: int, skip: tuple):
+        self.fetch = fetch
+        self.size = size
+        self.skip = skip
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.buffer = deque()
+        self.wake = asyncio.Event()
+        self.task = None
+        self.refill = None
+        self.claimed = False
+        self.backoff = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+
+class Prefetcher:
+    """
+    Keeps a few ready-to-send results for slow sources, refilled in the background.
+
+    Each source has a fetch coroutine function returning one result. Refills stop while a source's buffer is full or
+    the combined size of every buffer is over `max_bytes`, and back off exponentially while a source is erroring. A
+    live request arriving while a refill is in flight takes that refill's result instead of starting another fetch.
+    """
+
+    def __init__(self, loop, *, max_bytes: int = 32 * 1024 * 1024, max_backoff: float = 300):
+        self.loop = loop
+        self.max_bytes = max_bytes
+        self.max_backoff = max_backoff
+        self.size = 0
+        self.sources = {}
+
+    @property
+    def stats(self) -> dict:
+        """Buffer and hit counts for each source"""
+        return {name: {"buffered": len(src.buffer), "hits": src.hits, "misses": src.misses, "errors": src.errors}
+                for name, src in self.sources.items()}
+
+    def register(self, name: str, fetch, *, size: int = 3, concurrency: int = 1, skip: tuple = ()):
+        """
+        Start prefetching for a source.
+
+        :param name: Name of the source, usually the command using it.
+        :param fetch: Coroutine function returning one result.
+        :param size: How many results to keep buffered.
+        :param concurrency: How many fetches may run against the source at once, including live ones.
+        :param skip: Exceptions that reject a single result, such as one that is too big, rather than mean the source
+            is failing. These are retried straight away instead of backing off.
+        """
+        self.unregister(name)
+        source = self.sources[name] = _Source(fetch, size, concurrency, skip)
+        source.task = self.loop.create_task(self._fill(source))
+
+    def unregister(self, name: str):
+        """
+        Stop prefetching for a source and drop its buffer.
+        """
+        source = self.sources.pop(name, None)
+        if source is None:
+            return
+        source.task.cancel()
+        self.size -= sum(map(_sizeof, source.buffer))
+        self._wake()
+
+    def close(self):
+        """
+        Stop prefetching for every source.
+        """
+        for name in list(self.sources):
+            self.unregister(name)
+
+    async def get(self, name: str):
+        """
+        Get a result for a source, from its buffer if possible or by fetching one live.
+        """
+        source = self.sources[name]
+        if source.buffer:
+            source.hits += 1
+            item = source.buffer.popleft()
+            self.size -= _sizeof(item)
+            self._wake()
+            return item
+        source.misses += 1
+        refill = source.refill
+        if refill is not None and not refill.done() and not source.claimed:
+            source.claimed = True
+            try:
+                return await asyncio.shield(refill)
+            except asyncio.CancelledError:
+                if not refill.done():
+                    source.claimed = False
+                raise
+            except Exception:
+                pass
+        async with source.semaphore:
+            return await source.fetch()
+
+    async def _fetch(self, source: _Source):
+        async with source.semaphore:
+            return await source.fetch()
+
+    def _wake(self):
+        # Memory freed up by one source can let any other source refill
+        for source in self.sources.values():
+            source.wake.set()
+
+    async def _fill(self, source: _Source):
+        while True:
+            while len(source.buffer) >= source.size or self.size >= self.max_bytes:
+                source.wake.clear()
+                await source.wake.wait()
+            source.refill = self.loop.create_task(self._fetch(source))
+            try:
+                # Shielded, a live request may be waiting on this result
+                item = await asyncio.shield(source.refill)
+            except asyncio.CancelledError:
+                raise
+            except source.skip as e:
+                source.errors += 1
+                log.info(f"Skipped a prefetched result: {type(e).__name__}: {e}")
+                continue
+            except Exception as e:
+                source.errors += 1
+                source.backoff = min(source.backoff * 2 or 1, self.max_backoff)
+                log.warning(f"Prefetching failed with {type(e).__name__}: {e}, retrying in {source.backoff}s")
+                await asyncio.sleep(source.backoff)
+                continue
+            finally:
+                claimed, source.claimed = source.claimed, False
+            source.backoff = 0
+            if claimed:
+                continue
+            source.buffer.append(item)
+            self.size += _sizeof(item)
@@ -17,15 +17,65 @@ import hashlib
 import json
 import os
 import sys
+import time
 import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import aiohttp
-from sjcl import SJCL
+from Crypto.Cipher import AES
 
+from bot.utils.ratelimit import TokenBucket
 
-def _encrypt(text: str, password: str = None):
+
+class PrivateBinException(Exception):
+    """
+    Default PrivateBin exception.
+    """
+    pass
+
+
+def _sjcl_encrypt(plaintext: bytes, passphrase: bytes, count: int = 10000, key_size: int = 16):
+    """
+    Encrypts bytes in the same format as SJCL().encrypt(plaintext, passphrase, mode='gcm').
+
+    The key is derived with hashlib's PBKDF2 rather than the sjcl package's pure Python HMAC loop, which is over a
+    hundred times slower for the same output.
+    """
+    salt = os.urandom(8)
+    iv = os.urandom(16)
+    key = hashlib.pbkdf2_hmac('sha256', passphrase, salt, count, key_size)
+    ciphertext, mac = AES.new(key, AES.MODE_GCM, iv, mac_len=16).encrypt_and_digest(plaintext)
+    return {
+        'salt': base64.b64encode(salt),
+        'iter': count,
+        'ks': key_size * 8,
+        'ct': base64.b64encode(ciphertext + mac),
+        'iv': base64.b64encode(iv),
+        'cipher': 'aes',
+        'mode': 'gcm',
+        'adata': '',
+        'v': 1,
+        'ts': 128
+    }
+
+
+def _sjcl_decrypt(data: dict, passphrase: bytes) -> bytes:
+    """
+    Decrypts an SJCL GCM message, the counterpart to _sjcl_encrypt.
+    """
+    if data['cipher'] != 'aes' or data['mode'] != 'gcm':
+        raise PrivateBinException(f"Unsupported cipher {data['cipher']}-{data['mode']}")
+    key = hashlib.pbkdf2_hmac('sha256', passphrase, base64.b64decode(data['salt']), data['iter'], data['ks'] // 8)
+    ciphertext = base64.b64decode(data['ct'])
+    tag_length = data['ts'] // 8
+    cipher = AES.new(key, AES.MODE_GCM, base64.b64decode(data['iv']), mac_len=tag_length)
+    return cipher.decrypt_and_verify(ciphertext[:-tag_length], ciphertext[-tag_length:])
+
+
+def _encrypt(text, password: str = None):
     """
-    Supplies encrypted text for the payload.
+    Supplies encrypted text for the payload. Text may be given already UTF-8 encoded.
     """
     key = base64.urlsafe_b64encode(os.urandom(32))
 
@@ -36,7 +86,8 @@ def _encrypt(text: str, password: str = None):
         passphrase = key
 
     # Encrypting text
-    encrypted_data = SJCL().encrypt(_compress(text.encode()), passphrase, mode='gcm')
+    data = text if isinstance(text, bytes) else text.encode()
+    encrypted_data = _sjcl_encrypt(_compress(data), passphrase)
     return encrypted_data, key
 
 
@@ -50,7 +101,7 @@ def _decrypt(encrypted_data: dict, key: bytes, password: str = None):
     else:
         passphrase = key
 
-    data = _decompress(SJCL().decrypt(encrypted_data, passphrase).decode())
+    data = _decompress(_sjcl_decrypt(encrypted_data, passphrase).decode())
     return data
 
 
@@ -61,17 +112,18 @@ def _compress(s: bytes):
     co = zlib.compressobj(wbits=-zlib.MAX_WBITS)
     b = co.compress(s) + co.flush()
 
-    return base64.b64encode(''.join(map(chr, b)).encode())
+    # PrivateBin expects every deflated byte as a code point, UTF-8 encoded; latin-1 maps bytes to code points 1:1
+    return base64.b64encode(b.decode('latin-1').encode())
 
 
 def _decompress(s: str):
     """
     Decompresses bytes returned from the payload.
     """
-    return zlib.decompress(bytearray(map(ord, base64.b64decode(s.encode()).decode('utf-8'))), -zlib.MAX_WBITS).decode()
+    return zlib.decompress(base64.b64decode(s.encode()).decode('utf-8').encode('latin-1'), -zlib.MAX_WBITS).decode()
 
 
-def _make_payload(text: str, expires: str, formatter: str, password: str):
+def _make_payload(text, expires: str, formatter: str, password: str):
     """
     Creates the payload to be sent to PrivateBin.
     """
@@ -91,76 +143,114 @@ def _make_payload(text: str, expires: str, formatter: str, password: str):
     return request, key
 
 
-lock = asyncio.Lock()
-
-
-class PrivateBinException(Exception):
+def _warm():
     """
-    Default PrivateBin exception.
+    Does nothing, submitted to start up process pool workers ahead of time.
     """
     pass
 
 
-async def upload(text: str, expires: str, password: str = None, formatter: str = 'plaintext',
-                 server: str = 'https://privatebin.net/', loop=None):
+class PrivateBin:
     """
-    Uploads text to a https://privatebin.net instance.
-    """
-    loop = loop or asyncio.get_event_loop()
-
-    await lock.acquire()
-    result = None
-    payload, key = await loop.run_in_executor(None, _make_payload, text, expires, formatter, password)
-    python_version = '.'.join(map(str, sys.version_info[:3]))
-    async with aiohttp.ClientSession(headers={
-        'User-Agent': 'privatebin.py/0.1.3 aiohttp/%s python/%s' % (aiohttp.__version__, python_version),
-        'X-Requested-With': 'JSONHttpRequest'
-    }) as session:
-        for tries in range(2):
-            async with session.post(server, data=payload) as resp:
-                resp_json = await resp.json()
-                if resp_json['status'] == 0:
-                    result = _to_url(server, resp_json['id'], key)
-                    break
-                elif resp_json['status'] == 1:  # rate limited
-                    await asyncio.sleep(10)
+    Uploads to and downloads from a https://privatebin.net instance.
 
-    lock.release()
+    Requests share the given session. At most `concurrency` requests run at once, and uploads are paced by a token
+    bucket of `rate` uploads every `per` seconds matching the instance's traffic limiter, instead of sleeping after
+    being rate limited.
 
-    if result is None:
-        raise PrivateBinException('Failed to upload to privatebin')
-    else:
-        return result
-
-
-async def get(url: str, password: str = None):
-    """
-    Gets a paste from a https://privatebin.net instance.
+    Paste encryption runs in the default executor, or with `processes` set, in a pool of that many worker processes
+    started up front, so bursts of pastes encrypt in parallel without holding the event loop's GIL.
     """
 
-    await lock.acquire()
-    result = None
-    server, paste_id, passphrase = _from_url(url)
-    python_version = '.'.join(map(str, sys.version_info[:3]))
-    async with aiohttp.ClientSession(headers={
-        'User-Agent': 'privatebin.py/0.1.3 aiohttp/%s python/%s' % (aiohttp.__version__, python_version),
-        'X-Requested-With': 'JSONHttpRequest'
-    }) as session:
-        for tries in range(2):
-            async with session.get(_to_url(server, paste_id)) as _get:
-                resp_json = await _get.json()
+    def __init__(self, server: str = 'https://privatebin.net/', *, session: aiohttp.ClientSession, loop=None,
+                 concurrency: int = 4, rate: float = 1, per: float = 10, processes: int = 0):
+        self.server = server
+        self.session = session
+        self.loop = loop or asyncio.get_event_loop()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, per)
+        self.per = per
+        self.latencies = deque(maxlen=100)
+        self._pending = 0
+        self.executor = None
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers=processes)
+            for _ in range(processes):
+                self.executor.submit(_warm)
+        python_version = '.'.join(map(str, sys.version_info[:3]))
+        self.headers = {
+            'User-Agent': 'privatebin.py/0.1.3 aiohttp/%s python/%s' % (aiohttp.__version__, python_version),
+            'X-Requested-With': 'JSONHttpRequest'
+        }
+
+    @property
+    def stats(self) -> dict:
+        """Requests waiting or in flight, and latency of recent requests"""
+        latencies = sorted(self.latencies)
+        return {
+            'pending': self._pending,
+            'waiting_for_rate_limit': self.bucket.waiting,
+            'average_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+            'max_latency': latencies[-1] if latencies else 0.0
+        }
+
+    async def upload(self, text: str, expires: str, password: str = None, formatter: str = 'plaintext'):
+        """
+        Uploads text to the instance.
+        """
+        start = time.monotonic()
+        if self.executor is not None:
+            # Encoded text pickles straight across to the worker, without a UTF-8 round trip on each side
+            text = text.encode()
+        payload, key = await self.loop.run_in_executor(self.executor, _make_payload, text, expires, formatter,
+                                                       password)
+        self._pending += 1
+        try:
+            for tries in range(2):
+                # Take the token before a slot, so uploads waiting on the limiter don't hold slots reads could use
+                await self.bucket.acquire()
+                async with self.semaphore:
+                    async with self.session.post(self.server, data=payload, headers=self.headers) as resp:
+                        resp_json = await resp.json()
                 if resp_json['status'] == 0:
-                    data = json.loads(resp_json['data'])
-                    result = _decrypt(data, passphrase, password)
-                elif resp_json['status'] == 1:  # rate limited
-                    await asyncio.sleep(10)
+                    return _to_url(self.server, resp_json['id'], key)
+                elif resp_json['status'] == 1:  # rate limited anyway, wait out the limiter
+                    self.bucket.penalize(self.per)
+        finally:
+            self._pending -= 1
+            self.latencies.append(time.monotonic() - start)
 
-    lock.release()
+        raise PrivateBinException('Failed to upload to privatebin')
+
+    def close(self):
+        """
+        Shuts down the encryption worker processes, if any.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def get(self, url: str, password: str = None):
+        """
+        Gets a paste from the instance.
+        """
+        start = time.monotonic()
+        server, paste_id, passphrase = _from_url(url)
+        self._pending += 1
+        try:
+            async with self.semaphore:
+                for tries in range(2):
+                    async with self.session.get(_to_url(server, paste_id), headers=self.headers) as _get:
+                        resp_json = await _get.json()
+                    if resp_json['status'] == 0:
+                        data = json.loads(resp_json['data'])
+                        return await self.loop.run_in_executor(None, _decrypt, data, passphrase, password)
+                    elif resp_json['status'] == 1:  # rate limited
+                        await asyncio.sleep(self.per)
+        finally:
+            self._pending -= 1
+            self.latencies.append(time.monotonic() - start)
 
-    if result is None:
         raise PrivateBinException('Failed to download from privatebin')
-    else:
-        return result
 
 
 def _to_url(server: str, paste_id: str, key: bytes = None):
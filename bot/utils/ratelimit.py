@@ -0,0 +1,51 @@
+# coding=utf-8
+"""Rate limiting helpers for the bot"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions every `per` seconds, with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0, capacity: float = None):
+        self.rate = rate
+        self.per = per
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.waiting = 0
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    async def acquire(self):
+        """
+        Wait until a token is available and take it.
+        """
+        self.waiting += 1
+        try:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+        finally:
+            self.waiting -= 1
+
+    @property
+    def idle(self) -> bool:
+        """Whether nobody is waiting and the bucket is full, so it behaves the same as a new one"""
+        self._refill()
+        return not self.waiting and self.tokens >= self.capacity
+
+    def penalize(self, seconds: float):
+        """
+        Empty the bucket and hold off the next acquisition for `seconds`, e.g. after being rate limited anyway.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate / self.per + 1
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""Persistent command usage statistics for the bot"""
+import asyncio
+import os
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from discord.ext import commands
+
+BUCKET = 3600
+
+WINDOWS = {
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+    "all": None
+}
+
+
+class Window(commands.Converter):
+    """Converts a time window name (24h, 7d or all) to the number of seconds it covers, None being all time"""
+
+    async def convert(self, ctx, argument):
+        try:
+            return argument.lower(), WINDOWS[argument.lower()]
+        except KeyError:
+            raise commands.BadArgument(f"Time window must be one of {', '.join(WINDOWS)}, not {argument}")
+
+
+class CommandStats:
+    """
+    Command usage counted per command name and guild ID in hourly buckets, stored in SQLite.
+
+    Uses are counted in memory and written in one transaction every `flush_interval` seconds. Every query and write
+    runs on a single worker thread, so the connection is never shared between threads or touched by the event loop.
+    Direct messages are recorded under guild ID 0.
+    """
+
+    def __init__(self, loop, path: str = "cache/stats.db", *, flush_interval: float = 60):
+        self.loop = loop
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = Counter()
+        self._db = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = loop.create_task(self._flush_periodically())
+
+    def _connect(self):
+        """Opens the database, creating the table if needed"""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS command_usage (hour INTEGER, command TEXT, "
+                             "guild_id INTEGER, uses INTEGER, PRIMARY KEY (hour, command, guild_id))")
+        return self._db
+
+    def _write(self, batch: Counter):
+        """Adds a batch of counts to the database"""
+        db = self._connect()
+        with db:
+            db.executemany("INSERT OR IGNORE INTO command_usage VALUES (?, ?, ?, 0)", batch.keys())
+            db.executemany("UPDATE command_usage SET uses = uses + ? WHERE hour = ? AND command = ? AND guild_id = ?",
+                           [(uses, *key) for key, uses in batch.items()])
+
+    def _query(self, column: str, since: int) -> Counter:
+        """Sums uses by command or guild_id"""
+        rows = self._connect().execute(f"SELECT {column}, SUM(uses) FROM command_usage WHERE hour >= ? "
+                                       f"GROUP BY {column}", (since,))
+        return Counter(dict(rows))
+
+    def record(self, command: str, guild_id: int = None):
+        """
+        Count a use of a command.
+
+        :param command: Qualified name of the command.
+        :param guild_id: ID of the guild it was used in, or None for direct messages.
+        """
+        hour = int(time.time()) // BUCKET * BUCKET
+        self.pending[(hour, command, guild_id or 0)] += 1
+
+    async def flush(self):
+        """Writes counted uses to the database"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, Counter()
+        try:
+            await self.loop.run_in_executor(self._executor, self._write, batch)
+        except sqlite3.Error:
+            self.pending.update(batch)  # keep them for the next try
+            raise
+
+    async def _flush_periodically(self):
+        """Flushes every flush_interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except sqlite3.Error:
+                pass
+
+    async def _usage(self, index: int, column: str, window: int = None) -> Counter:
+        """Combines stored and unflushed uses since the start of a window"""
+        since = int(time.time()) - window if window is not None else 0
+        since = since // BUCKET * BUCKET
+        # Taken before querying, as a flush swapping out pending uses would be queued behind the query
+        pending = list(self.pending.items())
+        usage = await self.loop.run_in_executor(self._executor, self._query, column, since)
+        for key, uses in pending:
+            if key[0] >= since:
+                usage[key[index]] += uses
+        return usage
+
+    async def by_command(self, window: int = None) -> Counter:
+        """
+        Uses of each command.
+
+        :param window: Seconds to look back, or None for all time.
+        :return: Counter of command name to uses.
+        """
+        return await self._usage(1, "command", window)
+
+    async def by_guild(self, window: int = None) -> Counter:
+        """
+        Command uses in each guild.
+
+        :param window: Seconds to look back, or None for all time.
+        :return: Counter of guild ID to uses, 0 being direct messages.
+        """
+        return await self._usage(2, "guild_id", window)
+
+    async def close(self):
+        """Stops periodic flushing, writes what's left and closes the database"""
+        self._task.cancel()
+        try:
+            await self.flush()
+        finally:
+            if self._db is not None:
+                await self.loop.run_in_executor(self._executor, self._db.close)
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,77 @@
+# coding=utf-8
+"""Local tombstone rendering for the bot"""
+import functools
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+TEMPLATE = "bot/files/tombstone.png"
+
+# Writable face of the template stone as (left, top, right, bottom)
+_FACE = (80, 70, 340, 265)
+_INK = (45, 45, 45, 255)
+
+
+@functools.lru_cache()
+def _template(path: str) -> Image.Image:
+    return Image.open(path).convert("RGBA")
+
+
+@functools.lru_cache()
+def _font(path: str, size: int):
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:  # font isn't installed, fall back to Pillow's bitmap font
+        return ImageFont.load_default()
+
+
+def _fit(draw, text: str, path: str, size: int, width: int):
+    """Shrinks a font until the text fits on one line"""
+    font = _font(path, size)
+    while size > 10 and draw.textsize(text, font=font)[0] > width:
+        size -= 2
+        font = _font(path, size)
+    return font
+
+
+def _wrap(draw, text: str, font, width: int) -> list:
+    """Greedily wraps text into lines no wider than width"""
+    lines = []
+    for word in text.split():
+        if lines and draw.textsize(f"{lines[-1]} {word}", font=font)[0] <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+    return lines
+
+
+def render(name: str, epitaph: str, *, font: str = "DejaVuSans.ttf", template: str = TEMPLATE) -> bytes:
+    """
+    Render a tombstone without a browser.
+
+    :param name: Name of the deceased.
+    :param epitaph: Text carved below the name.
+    :param font: Path or name of a TrueType font.
+    :param template: Path to the tombstone template image.
+    :return: PNG bytes with a transparent background.
+    """
+    im = _template(template).copy()
+    draw = ImageDraw.Draw(im)
+    left, top, right, bottom = _FACE
+    width = right - left
+
+    lines = [("Here lies", _font(font, 18)), (name, _fit(draw, name, font, 32, width))]
+    epitaph_font = _font(font, 16)
+    lines += [(line, epitaph_font) for line in _wrap(draw, epitaph, epitaph_font, width)]
+
+    y = top
+    for text, text_font in lines:
+        text_width, text_height = draw.textsize(text, font=text_font)
+        if y + text_height > bottom:
+            break
+        draw.text((left + (width - text_width) // 2, y), text, font=text_font, fill=_INK)
+        y += text_height + 8
+
+    buffer = io.BytesIO()
+    im.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -1,5 +1,6 @@
 # coding=utf-8
 """Utilities for the bot"""
+import io
 import re
 
 import aiohttp
@@ -93,18 +94,58 @@ class InviteUserGuild(commands.Converter):
 # Utility functions
 
 
-async def get_file(bot: Bot, url: str) -> bytes:
+class DownloadError(commands.CommandError):
+    """Base exception for files that couldn't be downloaded"""
+    pass
+
+
+class FileTooLarge(DownloadError):
+    """Raised when a download is bigger than the size cap"""
+    pass
+
+
+class UnsupportedContentType(DownloadError):
+    """Raised when a download isn't of an accepted content type"""
+    pass
+
+
+IMAGE_TYPES = ("image/",)
+MEDIA_TYPES = ("image/", "video/")
+
+
+def _format_size(size: int) -> str:
+    """Formats a size in bytes as MB, or KB if under a megabyte"""
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.4g}MB"
+    return f"{size / 1024:.4g}KB"
+
+
+async def get_file(bot: Bot, url: str, *, max_size: int = None, content_types: tuple = MEDIA_TYPES) -> io.BytesIO:
     """
-    Get a file from the web using aiohttp.
+    Stream a file from the web using aiohttp.
+
+    The response is rejected as soon as its headers show it is too big or of the wrong type, and otherwise read in
+    chunks straight into the buffer that gets sent, stopping once it passes the size cap.
 
     :param bot: DiscordBot instance to grab session.
     :param url: URL to get file from.
-    :return: File bytes.
+    :param max_size: Maximum size in bytes, defaults to the `max_download` config value or Discord's 8MB limit.
+    :param content_types: Accepted content type prefixes, or None to accept anything.
+    :return: Buffer containing the file, positioned at the start.
     """
+    max_size = max_size or bot.config['extras'].get('max_download', 8 * 1024 * 1024)
     async with bot.session.get(url) as get:
-        assert isinstance(get, aiohttp.ClientResponse)
-        data = await get.read()
-        return data
+        if content_types and not get.content_type.startswith(content_types):
+            raise UnsupportedContentType(f"That file is a `{get.content_type}`, which I can't send.")
+        if get.content_length is not None and get.content_length > max_size:
+            raise FileTooLarge(f"That file is over the {_format_size(max_size)} limit.")
+        buffer = io.BytesIO()
+        async for chunk in get.content.iter_chunked(64 * 1024):
+            if buffer.tell() + len(chunk) > max_size:
+                raise FileTooLarge(f"That file is over the {_format_size(max_size)} limit.")
+            buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
 
 
 def neatly(entries: dict, colors="") -> str: